@@ -3,11 +3,15 @@ import yaml
 from typing import Dict, Any
 import logging
 
+# libyaml's C parser/emitter when PyYAML was built with it, else the pure-Python ones
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 
 def load_config(config_path: str) -> Dict[str, Any]:
     try:
         with open(config_path, 'r') as file:
-            config = yaml.safe_load(file)
+            config = yaml.load(file, Loader=YAML_LOADER)
         return config
     except FileNotFoundError:
         logging.error(f"Configuration file not found: {config_path}")
@@ -19,7 +19,9 @@ class DiscordListener(discord.Client):
         super().__init__(intents=intents, *args, **kwargs)
         
         self.token = token
-        self.channel_ids = [str(channel_id) for channel_id in channel_ids]
+        # Parsed once: Discord reports channel IDs as ints
+        self.channel_ids = tuple(int(channel_id) for channel_id in channel_ids)
+        self._channel_id_set = frozenset(self.channel_ids)
         self.message_callback = message_callback
         self.reconnect_attempts = reconnect_attempts
         self.message_throttle = message_throttle
@@ -44,16 +46,23 @@ class DiscordListener(discord.Client):
         logger.info(f"Discord listener connected as {self.user}")
         
         # Verify channels exist and are accessible
-        for channel_id in self.channel_ids:
-            channel = self.get_channel(int(channel_id))
-            if channel is None:
-                try:
-                    channel = await self.fetch_channel(int(channel_id))
-                except discord.errors.NotFound:
-                    logger.error(f"Channel ID {channel_id} not found")
-                except discord.errors.Forbidden:
-                    logger.error(f"No access to channel ID {channel_id}")
-            
+        channels = {channel_id: self.get_channel(channel_id) for channel_id in self.channel_ids}
+        
+        # Channels missing from the cache are fetched concurrently (one API round trip each)
+        missing = [channel_id for channel_id, channel in channels.items() if channel is None]
+        results = await asyncio.gather(*(self.fetch_channel(channel_id) for channel_id in missing),
+                                       return_exceptions=True)
+        for channel_id, result in zip(missing, results):
+            if isinstance(result, discord.errors.NotFound):
+                logger.error(f"Channel ID {channel_id} not found")
+            elif isinstance(result, discord.errors.Forbidden):
+                logger.error(f"No access to channel ID {channel_id}")
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                channels[channel_id] = result
+        
+        for channel_id, channel in channels.items():
             if channel:
                 logger.info(f"Monitoring channel: {channel.name} (ID: {channel.id})")
             else:
@@ -69,7 +78,7 @@ class DiscordListener(discord.Client):
             return
         
         # Check if the message is from a monitored channel
-        if str(message.channel.id) not in self.channel_ids:
+        if message.channel.id not in self._channel_id_set:
             return
         
         # Apply throttling if needed
@@ -79,7 +88,7 @@ class DiscordListener(discord.Client):
             return
         
         # Apply pattern filtering if specified
-        if self.message_pattern and not re.search(self.message_pattern, message.content):
+        if self.message_pattern and not self.message_pattern.search(message.content):
             return
         
         # Pass message to callback
@@ -8,6 +8,8 @@ from core.models import AlertInfo
 
 logger = logging.getLogger(__name__)
 
+CJK_CHAR_PATTERN = re.compile(r'[\u4e00-\u9fff]')
+
 
 class AlertParser(ABC):
     @abstractmethod
@@ -186,7 +188,7 @@ class ParserFactory:
     def detect_language(self, message: str) -> str:
         # Simple language detection based on character sets
         # This is a very basic implementation
-        chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', message))
+        chinese_chars = len(CJK_CHAR_PATTERN.findall(message))
         if chinese_chars > 5:  # If more than 5 Chinese characters
             return "chinese"
         return "english" 
\ No newline at end of file
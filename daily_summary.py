@@ -9,12 +9,13 @@ import yaml
 import subprocess
 from datetime import datetime, timedelta
 import argparse
+from config.config import YAML_LOADER
 
 def load_config(config_path: str) -> dict:
     """Load configuration"""
     try:
         with open(config_path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
+            return yaml.load(f, Loader=YAML_LOADER)
     except Exception as e:
         print(f"Error loading config: {e}")
         return {}
@@ -8,16 +8,21 @@ import logging
 import yaml
 import traceback
 from typing import Dict, Any, Optional
-from config.config import load_config
+from config.config import YAML_LOADER, load_config
 from core.orchestrator import TradingOrchestrator
 from utils.logging import setup_logging
 
+# Optional: uvloop's libuv-based event loop (not available on Windows)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 def load_config(config_path: str) -> Dict[str, Any]:
     """Load configuration from a YAML file."""
     try:
         with open(config_path, 'r') as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=YAML_LOADER)
         
         logging.info(f"Configuration loaded from {config_path}")
         return config
@@ -102,4 +107,7 @@ async def shutdown(trading_bot: TradingOrchestrator, loop: asyncio.AbstractEvent
 
 if __name__ == "__main__":
     # Run the main async function
-    asyncio.run(main()) 
\ No newline at end of file
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main()) 
\ No newline at end of file
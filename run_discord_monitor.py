@@ -18,6 +18,12 @@ from typing import Dict, Any, Set, List, Callable, Optional
 import platform
 import websocket
 import requests
+from config.config import YAML_DUMPER, YAML_LOADER
+
+DIGIT_PATTERN = re.compile(r'\d')
+
+# Marks a config key that does not resolve (None is a valid config value)
+_MISSING = object()
 
 # ANSI color codes for terminal output
 class Colors:
@@ -54,12 +60,14 @@ class ConfigManager:
             }
         }
         self.config_path = config_path
+        # Dotted key -> resolved value (or _MISSING); cleared whenever the config changes
+        self._cache: Dict[str, Any] = {}
         
         if config_path and os.path.exists(config_path):
             try:
                 # Explicitly use UTF-8 to avoid Windows default 'charmap' decode errors
                 with open(config_path, 'r', encoding='utf-8') as f:
-                    file_config = yaml.safe_load(f)
+                    file_config = yaml.load(f, Loader=YAML_LOADER)
                     if file_config:
                         self._update_config_recursive(self.config, file_config)
                         print(f"Configuration loaded from {config_path}")
@@ -77,7 +85,7 @@ class ConfigManager:
             
             # Save as UTF-8 to match read_config encoding and support non-ASCII comments
             with open(path, 'w', encoding='utf-8') as f:
-                yaml.dump(self.config, f, default_flow_style=False)
+                yaml.dump(self.config, f, Dumper=YAML_DUMPER, default_flow_style=False)
                 
             print(f"Configuration saved to {path}")
             return True
@@ -87,18 +95,21 @@ class ConfigManager:
             return False
     
     def get(self, key: str, default: Any = None) -> Any:
-        parts = key.split('.')
-        value = self.config
+        value = self._cache.get(key, _MISSING)
+        if value is _MISSING and key not in self._cache:
+            value = self.config
+            for part in key.split('.'):
+                if isinstance(value, dict) and part in value:
+                    value = value[part]
+                else:
+                    value = _MISSING
+                    break
+            self._cache[key] = value
         
-        for part in parts:
-            if isinstance(value, dict) and part in value:
-                value = value[part]
-            else:
-                return default
-                
-        return value
+        return default if value is _MISSING else value
     
     def set(self, key: str, value: Any) -> None:
+        self._cache.clear()
         parts = key.split('.')
         config = self.config
         
@@ -110,10 +121,17 @@ class ConfigManager:
         config[parts[-1]] = value
     
     def _update_config_recursive(self, target: Dict[str, Any], source: Dict[str, Any]) -> None:
-        for key, value in source.items():
-            if isinstance(value, dict) and key in target and isinstance(target[key], dict):
-                self._update_config_recursive(target[key], value)
-            else:
+        self._cache.clear()
+        # Nested sections are merged from an explicit stack rather than by recursion
+        stack = [(target, source)]
+        while stack:
+            target, source = stack.pop()
+            for key, value in source.items():
+                if isinstance(value, dict):
+                    target_value = target.get(key)
+                    if isinstance(target_value, dict):
+                        stack.append((target_value, value))
+                        continue
                 target[key] = value
 
 class NotificationAdapter:
@@ -201,7 +219,7 @@ class MessageProcessor:
                  user_filters: Optional[Dict[str, List[str]]] = None,
                  message_filters: Optional[Dict[str, List[str]]] = None):
         self.channel_ids = channel_ids
-        self.signal_keywords = [kw.lower() for kw in signal_keywords]
+        self.signal_keywords = tuple(kw.lower() for kw in signal_keywords)
         self.signal_callback = signal_callback
         self.processed_message_ids: Set[str] = set()
         self.token = token  # Store token for REST API calls
@@ -340,7 +358,7 @@ class MessageProcessor:
                     dt = datetime.datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
                     # Format as human-readable
                     timestamp = dt.strftime("%Y-%m-%d %H:%M:%S")
-            except:
+            except ValueError:
                 # If conversion fails, use original
                 pass
             
@@ -378,7 +396,7 @@ class MessageProcessor:
             # 只转发包含数字或图片的消息（过滤普通对话）
             # Only forward messages containing numbers or images (filter out normal conversations)
             combined_content_for_check = combined_content or content or ""
-            has_numbers = re.search(r'\d', combined_content_for_check) is not None
+            has_numbers = DIGIT_PATTERN.search(combined_content_for_check) is not None
             
             # 检查是否有图片附件
             attachments = message_data.get("attachments", [])
@@ -403,9 +421,9 @@ class MessageProcessor:
                 print(f"{Colors.YELLOW}[消息已过滤 - 未检测到数字或图片（可能是普通对话）]{Colors.RESET}")
             
             # Check if contains trading signal keywords - HIGHLIGHT IMPORTANT SIGNALS
-            if combined_content and self._is_trading_signal(combined_content):
+            matched_kw = self._match_signal_keywords(combined_content) if combined_content else []
+            if matched_kw:
                 print(f"\n{Colors.YELLOW}!!! TRADING SIGNAL DETECTED !!!{Colors.RESET}")
-                matched_kw = [kw for kw in self.signal_keywords if kw in combined_content.lower()]
                 print(f"{Colors.YELLOW}Matched keywords: {', '.join(matched_kw)}{Colors.RESET}")
                 self.signal_callback(message_data)
                 
@@ -460,13 +478,13 @@ class MessageProcessor:
             traceback.print_exc()
             return False
     
-    def _is_trading_signal(self, content: str) -> bool:
+    def _match_signal_keywords(self, content: str) -> List[str]:
+        """Signal keywords contained in content (empty when it is not a trading signal)"""
         content_lower = content.lower()
         matched_keywords = [kw for kw in self.signal_keywords if kw in content_lower]
         if matched_keywords:
             print(f"Matched keywords: {matched_keywords}")
-            return True
-        return False
+        return matched_keywords
     
     def _try_recover_content(self, message_data: Dict[str, Any]) -> Optional[str]:
         """Try to recover content from message data"""
@@ -3,40 +3,358 @@
 Script to fetch and summarize stock market messages from a specific user in a Discord channel
 """
 import os
+import re
 import sys
 import json
+import atexit
+import hashlib
+import importlib.util
+import textwrap
+import threading
+import traceback
+import unicodedata
+from bisect import bisect_right, insort
 import yaml
 import requests
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import IO, Callable, FrozenSet, Iterator, List, Dict, Any, Optional, Set, Tuple
+from datetime import date, datetime, timedelta
 import argparse
 import time
 import tempfile
 from io import BytesIO
+from concurrent.futures import Future, ThreadPoolExecutor
+from string import Formatter, Template
+
+from config.config import YAML_LOADER
 
 # OCR for image text extraction
-try:
-    import easyocr
-    from PIL import Image
-    import numpy as np
-    OCR_AVAILABLE = True
-except ImportError:
-    OCR_AVAILABLE = False
+# easyocr pulls in torch, so only check that it is installed here; OCR and PDF
+# modules are imported on first use
+OCR_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ("easyocr", "PIL", "numpy"))
+if not OCR_AVAILABLE:
     print("Warning: easyocr or Pillow not installed. OCR disabled. Install with: pip install easyocr Pillow")
 
 # PDF generation
+PDF_AVAILABLE = importlib.util.find_spec("reportlab") is not None
+if not PDF_AVAILABLE:
+    print("Warning: reportlab not installed. PDF generation disabled. Install with: pip install reportlab")
+
+# Optional: orjson decodes Discord API responses (up to 100 messages each) several
+# times faster than the stdlib parser; falls back to json when not installed
 try:
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-    from reportlab.lib.enums import TA_LEFT, TA_CENTER
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
-    PDF_AVAILABLE = True
+    import orjson
 except ImportError:
-    PDF_AVAILABLE = False
-    print("Warning: reportlab not installed. PDF generation disabled. Install with: pip install reportlab")
+    orjson = None
+
+
+def _json_loads(data: bytes) -> Any:
+    """Decode a JSON response body"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """Encode a JSON request body as UTF-8 bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def _json_dumps_indented(obj: Any) -> str:
+    """Encode a report record as 2-space indented JSON text"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+# Generated PDFs stay in memory up to this size, then spill to a temporary file
+PDF_SPOOL_MAX_SIZE = 4 * 1024 * 1024
+
+# ReportLab paragraph styles, built on first PDF (reportlab is imported lazily)
+_PDF_STYLES: Optional[Dict[str, Any]] = None
+
+
+def _get_pdf_styles() -> Dict[str, Any]:
+    """Get the shared PDF paragraph styles: title, heading, normal and bold"""
+    global _PDF_STYLES
+    if _PDF_STYLES is None:
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.enums import TA_CENTER
+        
+        styles = getSampleStyleSheet()
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=16,
+            textColor='#000000',
+            spaceAfter=12,
+            alignment=TA_CENTER
+        )
+        heading_style = ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=14,
+            textColor='#000000',
+            spaceAfter=10,
+            spaceBefore=12
+        )
+        normal_style = ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=10,
+            textColor='#000000',
+            spaceAfter=6,
+            leading=14
+        )
+        bold_style = ParagraphStyle(
+            'Bold',
+            parent=normal_style,
+            fontName='Helvetica-Bold'
+        )
+        _PDF_STYLES = {"title": title_style, "heading": heading_style, "normal": normal_style, "bold": bold_style}
+    return _PDF_STYLES
+
+
+# Per-message/per-order [DEBUG] output (off by default; printing it dominated analysis
+# time on large channels). Enable with --debug or SUMMARIZE_DEBUG=1
+DEBUG = bool(os.environ.get("SUMMARIZE_DEBUG"))
+
+# Section separator used in console and file reports
+_SEP = "=" * 80
+
+# Batched OCR resizes every image to this shape (easyocr needs equal sizes per batch)
+OCR_BATCH_WIDTH = 1024
+OCR_BATCH_HEIGHT = 1024
+OCR_BATCH_SIZE = 16
+# Messages queued while the OCR worker is busy are OCR'd together, up to this many images
+OCR_QUEUE_MAX_IMAGES = 32
+# Long-edge cap for the text detector (easyocr's default is 2560). Detector cost grows
+# with pixel count and screenshot text stays legible at this size; recognition still
+# reads the detected regions from the full-resolution image
+OCR_CANVAS_SIZE = 1200
+
+# Shared HTTP session: Discord API calls and image downloads reuse pooled keep-alive connections
+_HTTP_SESSION: Optional[requests.Session] = None
+
+# Transient failures (rate limits, 5xx) are retried with backoff; POSTs are not retried so
+# a message is never sent twice. raise_on_status=False keeps returning the last response.
+_HTTP_RETRY = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+
+# A rate-limited (429) POST was not accepted by Discord, so it is safe to re-send after the
+# wait Discord asks for; this many times at most
+DISCORD_POST_RATE_LIMIT_RETRIES = 3
+
+
+def _image_attachments(msg: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Return (filename, url) for each image attachment of a Discord message"""
+    images = []
+    for attachment in msg.get("attachments", []):
+        # Check if it's an image
+        content_type = attachment.get("content_type", "")
+        filename = attachment.get("filename", "")
+        if content_type.startswith("image/") or filename.lower().endswith((".png", ".jpg", ".jpeg", ".gif", ".webp")):
+            image_url = attachment.get("url", "")
+            if image_url:
+                images.append((filename, image_url))
+    return images
+
+
+def _iter_embed_texts(embeds: List[Dict[str, Any]]) -> Iterator[Optional[str]]:
+    """Yield title, description, fields, footer and author texts of Discord embeds (None where missing)"""
+    for embed in embeds:
+        yield embed.get("title")
+        yield embed.get("description")
+        # Fields are common in trading order cards
+        for field in embed.get("fields", ()):
+            yield field.get("name")
+            yield field.get("value")
+        yield embed.get("footer", {}).get("text")
+        yield embed.get("author", {}).get("name")
+
+
+def _safe_cut(text: str, limit: int) -> int:
+    """Largest offset <= limit that does not split a combining mark, variation selector or ZWJ sequence off its base"""
+    cut = limit
+    while 0 < cut < len(text) and (
+        unicodedata.combining(text[cut]) or "\ufe00" <= text[cut] <= "\ufe0f"
+        or text[cut] == "\u200d" or text[cut - 1] == "\u200d"
+    ):
+        cut -= 1
+    return cut or limit
+
+
+def _chunk_for_discord(content: str, max_length: int = 1900) -> List[str]:
+    """
+    Split a long message into chunks of at most max_length characters
+    
+    Chunks break at paragraph boundaries, then line boundaries; only a single line
+    longer than max_length is cut mid-text (never inside a grapheme cluster).
+    """
+    # (separator, text) pieces no longer than max_length
+    pieces = []
+    for paragraph in content.split("\n\n"):
+        separator = "\n\n"
+        for line in paragraph.split("\n") if len(paragraph) > max_length else [paragraph]:
+            while len(line) > max_length:
+                cut = _safe_cut(line, max_length)
+                pieces.append((separator, line[:cut]))
+                separator = ""
+                line = line[cut:]
+            pieces.append((separator, line))
+            separator = "\n"
+    
+    # Pack pieces greedily; separators at chunk boundaries are dropped
+    chunks = []
+    current = None
+    for separator, piece in pieces:
+        if current is not None and len(current) + len(separator) + len(piece) <= max_length:
+            current += separator + piece
+        else:
+            if current is not None:
+                chunks.append(current)
+            current = piece
+    if current is not None:
+        chunks.append(current)
+    return chunks
+
+
+# Optional: PyTurboJPEG decodes JPEG screenshots with libjpeg-turbo's SIMD decoder
+TURBOJPEG_AVAILABLE = importlib.util.find_spec("turbojpeg") is not None
+_TURBOJPEG = None
+
+
+def _get_turbojpeg() -> Any:
+    """Shared TurboJPEG decoder, or None if PyTurboJPEG or libturbojpeg is unavailable"""
+    global _TURBOJPEG, TURBOJPEG_AVAILABLE
+    if _TURBOJPEG is None and TURBOJPEG_AVAILABLE:
+        try:
+            from turbojpeg import TurboJPEG
+            _TURBOJPEG = TurboJPEG()
+        except Exception as e:
+            # PyTurboJPEG is installed but the libturbojpeg shared library is missing
+            print(f"Warning: Could not load libjpeg-turbo ({e}), JPEGs are decoded by easyocr")
+            TURBOJPEG_AVAILABLE = False
+    return _TURBOJPEG
+
+
+# Discord epoch (2015-01-01T00:00:00Z) in milliseconds
+DISCORD_EPOCH_MS = 1420070400000
+
+
+def _snowflake_at(moment: datetime) -> int:
+    """Smallest Discord snowflake ID created at or after moment (naive datetimes are local time)"""
+    return (int(moment.timestamp() * 1000) - DISCORD_EPOCH_MS) << 22
+
+
+def _parse_discord_timestamp(timestamp: Optional[str]) -> Optional[datetime]:
+    """Parse a Discord ISO 8601 timestamp, None if it is missing or malformed"""
+    if not timestamp:
+        return None
+    if timestamp.endswith('Z'):
+        timestamp = timestamp[:-1] + '+00:00'
+    try:
+        return datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+
+
+def _get_http_session() -> requests.Session:
+    """Get the process-wide HTTP session (created on first use)"""
+    global _HTTP_SESSION
+    if _HTTP_SESSION is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=_HTTP_RETRY)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _HTTP_SESSION = session
+    return _HTTP_SESSION
+
+
+OCR_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "discord_ocr")
+OCR_CACHE_TTL = 30 * 86400  # seconds
+
+
+class _JsonlTTLCache:
+    """On-disk text cache in an append-only jsonl file; subclasses define how entries are keyed"""
+    
+    def __init__(self, path: str, ttl: float, name: str):
+        """
+        Load cached entries, dropping entries older than ttl seconds
+        
+        Args:
+            path: Path of the jsonl file
+            ttl: Maximum age of an entry in seconds
+            name: Cache name used in warnings
+        """
+        self.path = path
+        self.name = name
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # Entries may be stored from worker threads (OCR worker, AI pool)
+        self._lock = threading.Lock()
+        cutoff = time.time() - ttl
+        expired = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("time", 0) < cutoff:
+                        expired += 1
+                        continue
+                    self._entries[entry["key"]] = entry
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Warning: Could not read {self.name} {self.path}: {e}")
+        if expired:
+            self._rewrite()
+    
+    @staticmethod
+    def _key(*key_args: str) -> str:
+        raise NotImplementedError
+    
+    def get(self, *key_args: str) -> Optional[str]:
+        entry = self._entries.get(self._key(*key_args))
+        return entry["text"] if entry else None
+    
+    def set(self, *key_args: str, text: str) -> None:
+        entry = {"key": self._key(*key_args), "text": text, "time": time.time()}
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._entries[entry["key"]] = entry
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            except OSError as e:
+                print(f"Warning: Could not update {self.name} {self.path}: {e}")
+    
+    def _rewrite(self) -> None:
+        # Compact the file once entries have expired
+        with self._lock:
+            try:
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    for entry in self._entries.values():
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"Warning: Could not rewrite {self.name} {self.path}: {e}")
+
+
+class OCRCache(_JsonlTTLCache):
+    """On-disk cache of OCR text per Discord image attachment"""
+    
+    def __init__(self, directory: str = OCR_CACHE_DIR, ttl: float = OCR_CACHE_TTL):
+        super().__init__(os.path.join(directory, "ocr_cache.jsonl"), ttl, "OCR cache")
+    
+    @staticmethod
+    def _key(image_url: str) -> str:
+        # Discord CDN URLs carry expiring signature params (?ex=...&is=...&hm=...);
+        # the path (channel id / attachment id / filename) identifies the image
+        return image_url.split("?", 1)[0]
+
 
 class DiscordMessageFetcher:
     """Fetch messages from Discord channels"""
@@ -48,16 +366,123 @@ class DiscordMessageFetcher:
             "Authorization": token,
             "Content-Type": "application/json"
         }
-        # Initialize OCR reader if available
-        self.ocr_reader = None
-        if OCR_AVAILABLE:
+        self.session = _get_http_session()
+        # OCR reader is created on first image (see ocr_reader)
+        self._ocr_reader = None
+        self._ocr_init_failed = False
+        # OCR runs on a background worker: fetch_all_user_messages queues images as pages
+        # arrive, so OCR overlaps pagination. One worker keeps the shared reader single-threaded.
+        # Pools start their threads on first submit; creating them here keeps channels
+        # fetched concurrently (see _fetch_user_channel) on the same pools
+        self._ocr_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr")
+        # _ocr_pending and _ocr_queue are shared by concurrent channel fetches and the OCR worker
+        self._ocr_pending: Dict[str, Future] = {}
+        self._ocr_queue: List[Tuple[List[str], Future]] = []
+        self._ocr_queue_lock = threading.Lock()
+        # Image downloads run in parallel on their own pool, ahead of the OCR worker
+        self._download_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="image-download")
+        self._downloads: Dict[str, Future] = {}
+        self._downloads_lock = threading.Lock()
+        # Attachments summarized on earlier runs are not downloaded and OCR'd again
+        self.ocr_cache = OCRCache() if OCR_AVAILABLE else None
+    
+    @property
+    def ocr_reader(self):
+        """EasyOCR reader, initialized on first use if OCR is available"""
+        if self._ocr_reader is None and OCR_AVAILABLE and not self._ocr_init_failed:
             try:
+                import easyocr
                 print("Initializing OCR reader (this may take a moment on first run)...")
-                self.ocr_reader = easyocr.Reader(['en', 'ch_sim'], gpu=False)  # Support English and Chinese
+                # Support English and Chinese; easyocr falls back to CPU when CUDA is unavailable
+                reader = easyocr.Reader(['en', 'ch_sim'], gpu=True, cudnn_benchmark=True)
+                if getattr(reader, 'device', 'cpu') != 'cpu':
+                    # Warm up so cuDNN autotuning happens before the first real batch
+                    import numpy as np
+                    reader.readtext_batched(np.zeros([2, OCR_BATCH_HEIGHT, OCR_BATCH_WIDTH, 3], np.uint8),
+                                            n_width=OCR_BATCH_WIDTH, n_height=OCR_BATCH_HEIGHT)
+                self._ocr_reader = reader
                 print("OCR reader initialized successfully")
             except Exception as e:
                 print(f"Warning: Failed to initialize OCR reader: {e}")
-                self.ocr_reader = None
+                self._ocr_init_failed = True
+        return self._ocr_reader
+    
+    def _download_image(self, image_url: str):
+        """
+        Download an image for OCR
+        
+        Returns the encoded bytes: easyocr decodes them with OpenCV itself, so decoding
+        here as well would only add a second full decode and copy. JPEGs are decoded with
+        PyTurboJPEG when it is installed, and GIFs (which OpenCV cannot read) with Pillow;
+        both are handed over as RGB arrays.
+        """
+        print(f"[OCR] Downloading image from: {image_url[:100]}...")
+        response = self.session.get(image_url, headers={"Authorization": self.token}, timeout=30)
+        response.raise_for_status()
+        image_bytes = response.content
+        print(f"[OCR] Image downloaded, {len(image_bytes)} bytes")
+        
+        if image_bytes[:2] == b"\xff\xd8":
+            jpeg_decoder = _get_turbojpeg()
+            if jpeg_decoder is not None:
+                from turbojpeg import TJPF_RGB
+                # easyocr expects RGB arrays; libjpeg-turbo converts during decode
+                image_array = jpeg_decoder.decode(image_bytes, pixel_format=TJPF_RGB)
+                print(f"[OCR] JPEG decoded with libjpeg-turbo, shape: {image_array.shape}")
+                return image_array
+        if image_bytes[:4] == b"GIF8":
+            from PIL import Image
+            import numpy as np
+            image = Image.open(BytesIO(image_bytes)).convert("RGB")
+            print(f"[OCR] GIF decoded, size: {image.size}")
+            return np.array(image)
+        return image_bytes
+    
+    def _start_download(self, image_url: str) -> Future:
+        """Start downloading an image in the background (no-op if already started)"""
+        with self._downloads_lock:
+            future = self._downloads.get(image_url)
+            if future is None:
+                future = self._download_pool.submit(self._download_image, image_url)
+                self._downloads[image_url] = future
+        return future
+    
+    def _take_download(self, image_url: str):
+        """Wait for an image download started by _start_download (raises its error)"""
+        future = self._start_download(image_url)
+        with self._downloads_lock:
+            self._downloads.pop(image_url, None)
+        return future.result()
+    
+    def _discard_download(self, image_url: str) -> None:
+        """Drop an image download that will not be used, cancelling it if it has not started"""
+        with self._downloads_lock:
+            future = self._downloads.pop(image_url, None)
+        if future is not None:
+            future.cancel()
+    
+    def _join_ocr_results(self, results: List[Any]) -> str:
+        """Combine easyocr results into one line of text, dropping low-confidence regions"""
+        print(f"[OCR] OCR found {len(results)} text regions")
+        extracted_lines = []
+        for result in results:
+            text = result[1]
+            confidence = result[2] if len(result) > 2 else 0
+            if confidence > 0.3:  # Filter low confidence results
+                extracted_lines.append(text)
+                print(f"[OCR] Text: '{text}' (confidence: {confidence:.2f})")
+        
+        extracted_text = " ".join(extracted_lines)
+        if extracted_text:
+            print(f"[OCR] Full extracted text: {extracted_text}")
+        else:
+            print(f"[OCR] No text extracted (all results below confidence threshold)")
+        return extracted_text
+    
+    def _ocr_full_size(self, image: Any) -> str:
+        """Re-run OCR at easyocr's default detector size after a downscaled pass found no text"""
+        print(f"[OCR] No text at reduced size, retrying at full resolution...")
+        return self._join_ocr_results(self.ocr_reader.readtext(image))
     
     def extract_text_from_image(self, image_url: str) -> str:
         """
@@ -69,53 +494,172 @@ class DiscordMessageFetcher:
         Returns:
             Extracted text from the image
         """
+        cached_text = self.ocr_cache.get(image_url) if self.ocr_cache else None
+        if cached_text is not None:
+            print(f"[OCR] Using cached text for image: {image_url[:100]}")
+            return cached_text
         if not OCR_AVAILABLE or not self.ocr_reader:
             print(f"[OCR] OCR not available or reader not initialized")
+            # queue_ocr may have started the download already
+            self._discard_download(image_url)
             return ""
         
         try:
-            # Download image
-            print(f"[OCR] Downloading image from: {image_url[:100]}...")
-            response = requests.get(image_url, headers={"Authorization": self.token}, timeout=30)
-            response.raise_for_status()
-            
-            # Load image and convert to numpy array (easyocr requires numpy array, not PIL Image)
-            image = Image.open(BytesIO(response.content))
-            print(f"[OCR] Image loaded, size: {image.size}")
-            
-            # Convert PIL Image to numpy array
-            image_array = np.array(image)
-            print(f"[OCR] Image converted to numpy array, shape: {image_array.shape}")
-            
-            # Extract text using OCR (pass numpy array or image bytes)
+            image = self._take_download(image_url)
             print(f"[OCR] Running OCR...")
-            # easyocr can accept numpy array directly
-            results = self.ocr_reader.readtext(image_array)
-            print(f"[OCR] OCR found {len(results)} text regions")
-            
-            # Combine all detected text with better formatting
-            extracted_lines = []
-            for result in results:
-                text = result[1]
-                confidence = result[2] if len(result) > 2 else 0
-                if confidence > 0.3:  # Filter low confidence results
-                    extracted_lines.append(text)
-                    print(f"[OCR] Text: '{text}' (confidence: {confidence:.2f})")
-            
-            extracted_text = " ".join(extracted_lines)
-            
-            if extracted_text:
-                print(f"[OCR] Full extracted text: {extracted_text}")
-            else:
-                print(f"[OCR] No text extracted (all results below confidence threshold)")
-            
+            # easyocr accepts encoded bytes or a numpy array directly
+            results = self.ocr_reader.readtext(image, canvas_size=OCR_CANVAS_SIZE)
+            extracted_text = self._join_ocr_results(results) or self._ocr_full_size(image)
+            if self.ocr_cache:
+                self.ocr_cache.set(image_url, text=extracted_text)
             return extracted_text
         except Exception as e:
             print(f"[OCR] Error extracting text from image {image_url}: {e}")
-            import traceback
             traceback.print_exc()
             return ""
     
+    def extract_text_from_images(self, image_urls: List[str]) -> List[str]:
+        """
+        Extract text from several images with one batched OCR call
+        
+        Args:
+            image_urls: URLs of the images to process
+        
+        Returns:
+            Extracted text per image, in the same order as image_urls ("" on failure)
+        """
+        texts = [""] * len(image_urls)
+        uncached = []
+        for i, image_url in enumerate(image_urls):
+            cached_text = self.ocr_cache.get(image_url) if self.ocr_cache else None
+            if cached_text is not None:
+                print(f"[OCR] Using cached text for image: {image_url[:100]}")
+                texts[i] = cached_text
+            else:
+                uncached.append(i)
+        if len(uncached) <= 1:
+            for i in uncached:
+                texts[i] = self.extract_text_from_image(image_urls[i])
+            return texts
+        if not OCR_AVAILABLE or not self.ocr_reader:
+            print(f"[OCR] OCR not available or reader not initialized")
+            for i in uncached:
+                self._discard_download(image_urls[i])
+            return texts
+        
+        images = []
+        indices = []
+        # Download all images concurrently, then OCR them as one batch
+        for i in uncached:
+            self._start_download(image_urls[i])
+        for i in uncached:
+            image_url = image_urls[i]
+            try:
+                images.append(self._take_download(image_url))
+                indices.append(i)
+            except Exception as e:
+                print(f"[OCR] Error downloading image {image_url}: {e}")
+        if not images:
+            return texts
+        
+        try:
+            print(f"[OCR] Running batched OCR on {len(images)} images...")
+            # Images are resized to a common shape so they can share one batch
+            batch_results = self.ocr_reader.readtext_batched(
+                images, n_width=OCR_BATCH_WIDTH, n_height=OCR_BATCH_HEIGHT, batch_size=OCR_BATCH_SIZE
+            )
+        except Exception as e:
+            print(f"[OCR] Batched OCR failed ({e}), falling back to one image at a time")
+            batch_results = []
+            for i, image in zip(indices, images):
+                try:
+                    batch_results.append(self.ocr_reader.readtext(image, canvas_size=OCR_CANVAS_SIZE))
+                except Exception as e:
+                    # One unreadable image leaves only its own text blank
+                    print(f"[OCR] Error extracting text from image {image_urls[i]}: {e}")
+                    batch_results.append([])
+        
+        for i, image, results in zip(indices, images, batch_results):
+            texts[i] = self._join_ocr_results(results)
+            if not texts[i]:
+                try:
+                    texts[i] = self._ocr_full_size(image)
+                except Exception as e:
+                    print(f"[OCR] Error extracting text from image {image_urls[i]}: {e}")
+                    continue
+            if self.ocr_cache:
+                self.ocr_cache.set(image_urls[i], text=texts[i])
+        return texts
+    
+    def queue_ocr(self, msg: Dict[str, Any]) -> Optional[Future]:
+        """
+        Start OCR for the image attachments of a message in the background
+        
+        Args:
+            msg: Discord message object
+        
+        Returns:
+            Future resolving to the extracted text per image, or None if there is nothing to OCR
+        """
+        if not OCR_AVAILABLE:
+            return None
+        msg_id = msg.get("id", "")
+        with self._ocr_queue_lock:
+            pending = self._ocr_pending.get(msg_id)
+        if pending is not None:
+            return pending
+        image_urls = [url for _, url in _image_attachments(msg)]
+        if not image_urls:
+            return None
+        # Downloads start right away, so they overlap OCR of earlier messages
+        for image_url in image_urls:
+            if not (self.ocr_cache and self.ocr_cache.get(image_url) is not None):
+                self._start_download(image_url)
+        future: Future = Future()
+        with self._ocr_queue_lock:
+            self._ocr_queue.append((image_urls, future))
+            if msg_id:
+                self._ocr_pending[msg_id] = future
+        # One drain per queued message; a drain may take several messages, later ones then find less to do
+        self._ocr_pool.submit(self._run_ocr_queue)
+        return future
+    
+    def _run_ocr_queue(self) -> None:
+        """OCR the messages queued so far as one batch (runs on the OCR worker)"""
+        jobs = []
+        image_count = 0
+        with self._ocr_queue_lock:
+            while self._ocr_queue and (not jobs or image_count + len(self._ocr_queue[0][0]) <= OCR_QUEUE_MAX_IMAGES):
+                image_urls, future = self._ocr_queue.pop(0)
+                jobs.append((image_urls, future))
+                image_count += len(image_urls)
+        if not jobs:
+            return
+        
+        try:
+            texts = self.extract_text_from_images([url for image_urls, _ in jobs for url in image_urls])
+        except Exception as e:
+            for _, future in jobs:
+                future.set_exception(e)
+            return
+        offset = 0
+        for image_urls, future in jobs:
+            future.set_result(texts[offset:offset + len(image_urls)])
+            offset += len(image_urls)
+    
+    def ocr_message_images(self, msg: Dict[str, Any]) -> List[str]:
+        """Get OCR text per image attachment of a message, waiting for queued OCR if needed"""
+        future = self.queue_ocr(msg)
+        with self._ocr_queue_lock:
+            self._ocr_pending.pop(msg.get("id", ""), None)
+        if not future:
+            return []
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"[OCR] Error extracting text from message {msg.get('id', '')}: {e}")
+            return [""] * len(_image_attachments(msg))
+    
     def fetch_messages(self, channel_id: str, limit: int = 100, before: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Fetch messages from a channel
@@ -135,9 +679,9 @@ class DiscordMessageFetcher:
             params["before"] = before
         
         try:
-            response = requests.get(url, headers=self.headers, params=params)
+            response = self.session.get(url, headers=self.headers, params=params)
             response.raise_for_status()
-            return response.json()
+            return _json_loads(response.content)
         except requests.exceptions.RequestException as e:
             print(f"Error fetching messages: {e}")
             if hasattr(e.response, 'text'):
@@ -164,8 +708,12 @@ class DiscordMessageFetcher:
         
         # Calculate 24 hours ago timestamp if needed
         cutoff_time = None
+        cutoff_snowflake = None
         if last_24_hours:
             cutoff_time = datetime.now() - timedelta(hours=24)
+            # Message IDs are snowflakes that start with the creation time, so the
+            # cutoff check is an integer comparison instead of parsing timestamps
+            cutoff_snowflake = _snowflake_at(cutoff_time)
             print(f"Fetching messages from last 24 hours (since {cutoff_time.strftime('%Y-%m-%d %H:%M:%S')})...")
         else:
             print(f"Fetching messages from user '{username}' in channel {channel_id}...")
@@ -180,22 +728,20 @@ class DiscordMessageFetcher:
             # Filter messages from the target user and time range
             for msg in messages:
                 # Check time filter first (more efficient)
-                if last_24_hours and cutoff_time:
+                if cutoff_snowflake is not None:
                     try:
-                        msg_timestamp = datetime.fromisoformat(msg.get("timestamp", "").replace('Z', '+00:00'))
-                        # Convert to local time for comparison
-                        if msg_timestamp.tzinfo:
-                            msg_timestamp = msg_timestamp.replace(tzinfo=None)
-                        if msg_timestamp < cutoff_time:
+                        if int(msg["id"]) < cutoff_snowflake:
                             # Messages are ordered newest first, so if we hit old messages, we're done
                             return user_messages
-                    except:
-                        pass  # Skip time check if timestamp parsing fails
+                    except (KeyError, TypeError, ValueError):
+                        pass  # Skip time check if the message ID is missing or malformed
                 
                 # Check user filter
                 msg_author = msg.get("author", {}).get("username", "").lower()
                 if msg_author == username_lower:
                     user_messages.append(msg)
+                    # Start OCR now so it runs while the next pages are fetched
+                    self.queue_ocr(msg)
             
             all_messages.extend(messages)
             
@@ -216,115 +762,107 @@ class DiscordMessageFetcher:
         """Get channel information"""
         url = f"{self.base_url}/channels/{channel_id}"
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self.session.get(url, headers=self.headers)
             response.raise_for_status()
-            return response.json()
+            return _json_loads(response.content)
         except requests.exceptions.RequestException as e:
             print(f"Error fetching channel info: {e}")
             return None
     
-    def generate_pdf(self, content: str, filename: str = None) -> Optional[BytesIO]:
+    def _iter_flowables(self, content: str, heading_style: Any, normal_style: Any, bold_style: Any) -> Iterator[Any]:
+        """Yield the ReportLab flowables for content, one line at a time"""
+        from reportlab.platypus import Paragraph, Spacer
+        
+        for line in content.split('\n'):
+            line = line.strip()
+            if not line:
+                yield Spacer(1, 6)
+                continue
+            
+            # Check if it's a heading (starts with # or **)
+            if line.startswith('###') or line.startswith('##') or line.startswith('#'):
+                # Remove markdown formatting
+                clean_line = line.lstrip('#').strip()
+                if clean_line.startswith('**') and clean_line.endswith('**'):
+                    clean_line = clean_line[2:-2]
+                yield Paragraph(clean_line, heading_style)
+                yield Spacer(1, 6)
+            elif line.startswith('**') and line.endswith('**'):
+                # Bold text
+                clean_line = line[2:-2]
+                yield Paragraph(clean_line, bold_style)
+            elif line.startswith('*') and line.endswith('*'):
+                # Italic or bullet point
+                clean_line = line.strip('*').strip()
+                yield Paragraph(f"• {clean_line}", normal_style)
+            elif line.startswith('=') and len(line) > 10:
+                # Separator line
+                yield Spacer(1, 12)
+            else:
+                # Normal text
+                # Escape special characters for ReportLab
+                clean_line = line.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+                yield Paragraph(clean_line, normal_style)
+    
+    def generate_pdf(self, content: str, filename: str = None) -> Optional[IO[bytes]]:
         """
         Generate a PDF file from text content
         
         Args:
             content: Text content to convert to PDF
-            filename: Optional filename (not used, returns BytesIO)
+            filename: Optional filename (not used, returns a file object)
         
         Returns:
-            BytesIO object containing PDF data, or None if PDF generation fails
+            Binary file object positioned at the start of the PDF data (kept in memory
+            up to PDF_SPOOL_MAX_SIZE, then spilled to a temporary file), or None if PDF
+            generation fails. The caller should close it.
         """
         if not PDF_AVAILABLE:
             print("Error: reportlab not installed. Cannot generate PDF.")
             return None
         
+        buffer = None
         try:
-            # Create PDF in memory
-            buffer = BytesIO()
+            from reportlab.lib.pagesizes import A4
+            from reportlab.platypus import SimpleDocTemplate
+            
+            # Large reports go to disk instead of being held in RAM until upload
+            buffer = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
             doc = SimpleDocTemplate(buffer, pagesize=A4,
                                   rightMargin=72, leftMargin=72,
                                   topMargin=72, bottomMargin=18)
             
-            # Container for the 'Flowable' objects
-            elements = []
+            styles = _get_pdf_styles()
             
-            # Define styles
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=16,
-                textColor='#000000',
-                spaceAfter=12,
-                alignment=TA_CENTER
-            )
-            heading_style = ParagraphStyle(
-                'CustomHeading',
-                parent=styles['Heading2'],
-                fontSize=14,
-                textColor='#000000',
-                spaceAfter=10,
-                spaceBefore=12
-            )
-            normal_style = ParagraphStyle(
-                'CustomNormal',
-                parent=styles['Normal'],
-                fontSize=10,
-                textColor='#000000',
-                spaceAfter=6,
-                leading=14
-            )
-            
-            # Split content into lines and process
-            lines = content.split('\n')
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    elements.append(Spacer(1, 6))
-                    continue
-                
-                # Check if it's a heading (starts with # or **)
-                if line.startswith('###') or line.startswith('##') or line.startswith('#'):
-                    # Remove markdown formatting
-                    clean_line = line.lstrip('#').strip()
-                    if clean_line.startswith('**') and clean_line.endswith('**'):
-                        clean_line = clean_line[2:-2]
-                    elements.append(Paragraph(clean_line, heading_style))
-                    elements.append(Spacer(1, 6))
-                elif line.startswith('**') and line.endswith('**'):
-                    # Bold text
-                    clean_line = line[2:-2]
-                    bold_style = ParagraphStyle(
-                        'Bold',
-                        parent=normal_style,
-                        fontName='Helvetica-Bold'
-                    )
-                    elements.append(Paragraph(clean_line, bold_style))
-                elif line.startswith('*') and line.endswith('*'):
-                    # Italic or bullet point
-                    clean_line = line.strip('*').strip()
-                    elements.append(Paragraph(f"• {clean_line}", normal_style))
-                elif line.startswith('=') and len(line) > 10:
-                    # Separator line
-                    elements.append(Spacer(1, 12))
-                else:
-                    # Normal text
-                    # Escape special characters for ReportLab
-                    clean_line = line.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                    elements.append(Paragraph(clean_line, normal_style))
-            
-            # Build PDF
-            doc.build(elements)
+            # Build PDF (platypus consumes a list, so the generator is materialized here)
+            doc.build(list(self._iter_flowables(content, styles["heading"], styles["normal"], styles["bold"])))
             buffer.seek(0)
             return buffer
             
         except Exception as e:
             print(f"Error generating PDF: {e}")
-            import traceback
             traceback.print_exc()
+            if buffer is not None:
+                buffer.close()
             return None
     
-    def send_message(self, channel_id: str, content: str, as_pdf: bool = False) -> bool:
+    def _post_message(self, url: str, payload: Dict[str, Any]) -> requests.Response:
+        """POST a text message, waiting out and re-sending on 429 responses"""
+        data = _json_dumps(payload)
+        for _ in range(DISCORD_POST_RATE_LIMIT_RETRIES):
+            response = self.session.post(url, headers=self.headers, data=data)
+            if response.status_code != 429:
+                break
+            retry_after = float(response.headers.get("Retry-After") or
+                                response.headers.get("X-RateLimit-Reset-After") or 1)
+            print(f"Rate limited by Discord, retrying in {retry_after:.1f}s...")
+            time.sleep(retry_after)
+        else:
+            response = self.session.post(url, headers=self.headers, data=data)
+        return response
+    
+    def send_message(self, channel_id: str, content: str, as_pdf: bool = False,
+                     pdf_buffer: Optional[IO[bytes]] = None) -> bool:
         """
         Send a message to a Discord channel
         
@@ -332,6 +870,7 @@ class DiscordMessageFetcher:
             channel_id: Discord channel ID
             content: Message content
             as_pdf: If True, send as PDF file instead of text message
+            pdf_buffer: PDF of content already built by generate_pdf (closed after sending)
         
         Returns:
             True if successful, False otherwise
@@ -339,8 +878,9 @@ class DiscordMessageFetcher:
         url = f"{self.base_url}/channels/{channel_id}/messages"
         
         if as_pdf:
-            # Generate PDF and send as file
-            pdf_buffer = self.generate_pdf(content)
+            # Generate PDF (unless the caller already did) and send as file
+            if pdf_buffer is None:
+                pdf_buffer = self.generate_pdf(content)
             if not pdf_buffer:
                 print("Failed to generate PDF, falling back to text message")
                 return self.send_message(channel_id, content, as_pdf=False)
@@ -360,7 +900,7 @@ class DiscordMessageFetcher:
             try:
                 # Remove Content-Type header for multipart/form-data
                 headers = {k: v for k, v in self.headers.items() if k.lower() != 'content-type'}
-                response = requests.post(url, headers=headers, data=data, files=files)
+                response = self.session.post(url, headers=headers, data=data, files=files)
                 response.raise_for_status()
                 print(f"✓ PDF sent successfully: {filename}")
                 return True
@@ -369,6 +909,8 @@ class DiscordMessageFetcher:
                 if hasattr(e, 'response') and e.response is not None:
                     print(f"Response: {e.response.text[:200]}")
                 return False
+            finally:
+                pdf_buffer.close()
         else:
             # Original text message sending logic
             # Discord has a 2000 character limit per message
@@ -378,7 +920,7 @@ class DiscordMessageFetcher:
             if len(content) <= max_length:
                 payload = {"content": content}
                 try:
-                    response = requests.post(url, headers=self.headers, json=payload)
+                    response = self._post_message(url, payload)
                     response.raise_for_status()
                     return True
                 except requests.exceptions.RequestException as e:
@@ -387,41 +929,227 @@ class DiscordMessageFetcher:
                         print(f"Response: {e.response.text[:200]}")
                     return False
             else:
-                # Split into chunks
-                chunks = [content[i:i+max_length] for i in range(0, len(content), max_length)]
+                # Split into chunks at paragraph/line boundaries
+                chunks = _chunk_for_discord(content, max_length)
                 success = True
                 for i, chunk in enumerate(chunks):
                     chunk_header = f"**消息 {i+1}/{len(chunks)}**\n\n" if len(chunks) > 1 else ""
                     payload = {"content": chunk_header + chunk}
                     try:
-                        response = requests.post(url, headers=self.headers, json=payload)
+                        response = self._post_message(url, payload)
                         response.raise_for_status()
-                        time.sleep(0.5)  # Rate limit protection
+                        # Rate limit protection: only wait when the bucket is exhausted
+                        if response.headers.get("X-RateLimit-Remaining") == "0":
+                            time.sleep(float(response.headers.get("X-RateLimit-Reset-After", 1)))
                     except requests.exceptions.RequestException as e:
                         print(f"Error sending message chunk {i+1}: {e}")
                         success = False
                 return success
 
 
+# Keywords related to stock market
+_STOCK_KEYWORDS = (
+    "stock", "stocks", "equity", "equities",
+    "ticker", "tickers", "symbol", "symbols",
+    "buy", "sell", "long", "short", "position",
+    "bullish", "bearish", "bull", "bear",
+    "price", "target", "entry", "exit", "stop loss",
+    "earnings", "revenue", "profit", "loss",
+    "market", "trading", "trade", "trader",
+    "crypto", "bitcoin", "btc", "eth", "ethereum",
+    "forex", "fx", "currency", "currencies",
+    "option", "options", "call", "put",
+    "dividend", "yield", "pe ratio", "valuation",
+    "ipo", "merger", "acquisition", "split"
+)
+
+# Keywords are matched as substrings, so any keyword containing a shorter one
+# ("stocks" -> "stock", "bullish" -> "bull") can never decide a match on its own
+_STOCK_KEYWORDS_MIN = tuple(
+    keyword for keyword in _STOCK_KEYWORDS
+    if not any(other != keyword and other in keyword for other in _STOCK_KEYWORDS)
+)
+
+# Optional: pyahocorasick scans for all keywords in one O(len(content)) pass.
+# Falls back to `in` checks over _STOCK_KEYWORDS_MIN when not installed; str's C
+# substring search beats a re alternation of the same literals by ~2x, even on
+# long OCR text.
+try:
+    import ahocorasick
+    _STOCK_KEYWORDS_AUTOMATON = ahocorasick.Automaton()
+    for _keyword in _STOCK_KEYWORDS:
+        _STOCK_KEYWORDS_AUTOMATON.add_word(_keyword, _keyword)
+    _STOCK_KEYWORDS_AUTOMATON.make_automaton()
+except ImportError:
+    _STOCK_KEYWORDS_AUTOMATON = None
+
+
+def _has_stock_keyword(content_lower: str) -> bool:
+    """Check whether lowercased content contains any stock keyword (substring match)"""
+    if _STOCK_KEYWORDS_AUTOMATON is not None:
+        for _ in _STOCK_KEYWORDS_AUTOMATON.iter(content_lower):
+            return True
+        return False
+    return any(keyword in content_lower for keyword in _STOCK_KEYWORDS_MIN)
+
+
+# Analyzer regexes are compiled once at import instead of on every message.
+# Options patterns: "166p", "609p", "166c", etc.
+_OPTIONS_PC_RE = re.compile(r'\b\d+[pc]\b', re.IGNORECASE)
+# Percentage patterns: "+90%", "gain 60%", etc.
+_PCT_RE = re.compile(r'[\+\-]?\d+%')
+# Price patterns: "2.89", "1.96", "成本0.96", etc.
+_PRICE_RE = re.compile(r'(?:成本|price|@|at)\s*[\d,]+\.?\d*', re.IGNORECASE)
+# Ticker patterns: $AAPL format, standalone uppercase (1-5 chars)
+_TICKER_DOLLAR_RE = re.compile(r'\$([A-Z]{1,5})\b')
+_TICKER_BARE_RE = re.compile(r'\b([A-Z]{1,5})\b')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Common all-caps words matched by _TICKER_BARE_RE that are not tickers
+# ("bet" is not a ticker, it means "small position gambling")
+_NON_TICKERS = frozenset({
+    'BET', 'PUT', 'CALL', 'BUY', 'SELL', 'LONG', 'SHORT', 'AND', 'THE', 'FOR', 'ARE', 'BUT', 'NOT', 'YOU',
+    'ALL', 'CAN', 'HER', 'WAS', 'ONE', 'OUR', 'OUT', 'DAY', 'GET', 'HAS', 'HIM', 'HIS', 'HOW', 'ITS', 'MAY',
+    'NEW', 'NOW', 'OLD', 'SEE', 'TWO', 'WAY', 'WHO', 'BOY', 'DID', 'LET', 'SAY', 'SHE', 'TOO', 'USE',
+    'USD', 'OCR', 'GPT',
+})
+
+
+def load_ticker_list(path: str) -> Optional[FrozenSet[str]]:
+    """
+    Load listed ticker symbols from a text/CSV file
+    
+    Args:
+        path: File with one symbol per line; for CSV files the first column is used
+    
+    Returns:
+        Set of uppercase symbols, or None if the file cannot be read
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return frozenset(
+                symbol for symbol in (line.split(',', 1)[0].strip().upper() for line in f)
+                if symbol and not symbol.startswith('#')
+            )
+    except OSError as e:
+        print(f"Warning: Could not load ticker list {path}: {e}")
+        return None
+
+# Literals every order pattern of a family needs, in lowercase: they are searched in
+# the lowercased message, which is about 2x faster than re.IGNORECASE matching.
+# Most chat messages contain none of them, so whole families are skipped without
+# running their (partly backtracking-heavy) patterns.
+_ORDER_TRIGGERS = {
+    trigger: re.compile(literals) for trigger, literals in {
+        'options': r'\d[pc]',
+        'buy': r'buy|bought|long|entered|entry|买入|做多|加了一笔',
+        'bet': r'bet',
+        'sell': r'sell|sold|short|exit|closed|cover|卖出|做空|平仓|切',
+        'position': r'现|current|成本|cost',
+        'put_call': r'put|call',
+        'cn_buy_sell': r'买入|卖出',
+        'filled': r'成交',
+    }.items()
+}
+
+# Patterns for order extraction - More flexible patterns to match various formats
+# Buy/Sell patterns: "buy 100 TSLA at $250", "sold 50 shares", "long AAPL", "买入100股", etc.
+# Also supports options: "mstr weekly 166p 2.89", "qqq 609p 1.96", etc.
+_ORDER_PATTERNS = tuple((re.compile(pattern, re.IGNORECASE), order_type, _ORDER_TRIGGERS[trigger]) for pattern, order_type, trigger in [
+    # Options patterns: "mstr weekly 166p 2.89", "qqq 609p 1.96"
+    (r'([A-Z]{1,5})\s+(?:weekly|monthly|daily)?\s*(\d+)([pc])\s+([\d,]+\.?\d*)', 'buy', 'options'),  # Options format
+    (r'([A-Z]{1,5})\s*(\d+)([pc])\s+([\d,]+\.?\d*)', 'buy', 'options'),  # Simplified options
+    # Buy patterns - quantity first
+    (r'(?:buy|bought|long|entered|entry|买入|做多|加了一笔)\s+(?:@|at|@|在)?\s*(\d+)\s*(?:shares?|contracts?|股|手|份)?\s*(?:of\s+)?([A-Z]{1,5})\s*(?:@|at|@|在)?\s*\$?([\d,]+\.?\d*)', 'buy', 'buy'),
+    # Buy patterns - ticker first
+    (r'(?:buy|bought|long|entered|entry|买入|做多|加了一笔)\s+([A-Z]{1,5})\s+(?:@|at|@|在)?\s*\$?([\d,]+\.?\d*)\s*(?:x|×|乘)?\s*(\d+)', 'buy', 'buy'),
+    # Buy patterns - simplified (just ticker and price, assume quantity 1)
+    (r'(?:buy|bought|long|entered|entry|买入|做多|加了一笔)\s+([A-Z]{1,5})\s+(?:@|at|@|在)?\s*\$?([\d,]+\.?\d*)', 'buy', 'buy'),
+    # "bet" pattern - "bet" means small position, followed by option info
+    # Format: "bet TICKER STRIKE P/C PRICE" or "bet TICKER STRIKEP/C PRICE"
+    (r'bet\s+([A-Z]{1,5})\s+(\d+)([pc])\s+([\d,]+\.?\d*)', 'buy', 'bet'),
+    # "bet" with quantity: "bet 100 TSLA 250c 2.5"
+    (r'bet\s+(\d+)\s+([A-Z]{1,5})\s+(\d+)([pc])\s+([\d,]+\.?\d*)', 'buy', 'bet'),
+    # "bet PUT/CALL TICKER" format: "bet PUT BAC" or "bet CALL TSLA"
+    (r'bet\s+(?:PUT|CALL|put|call)\s+([A-Z]{1,5})', 'buy', 'bet'),
+    # "bet PUT/CALL TICKER STRIKE" format: "bet PUT BAC 50" or "bet CALL TSLA 250"
+    (r'bet\s+(?:PUT|CALL|put|call)\s+([A-Z]{1,5})\s+(\d+)', 'buy', 'bet'),
+    # "bet PUT/CALL TICKER STRIKE PRICE" format: "bet PUT BAC 50 2.5"
+    (r'bet\s+(?:PUT|CALL|put|call)\s+([A-Z]{1,5})\s+(\d+)\s+([\d,]+\.?\d*)', 'buy', 'bet'),
+    # Sell patterns - quantity first
+    (r'(?:sell|sold|short|exit|closed|cover|卖出|做空|平仓|切掉|切|卖出部份)\s+(?:@|at|@|在)?\s*(\d+)\s*(?:shares?|contracts?|股|手|份)?\s*(?:of\s+)?([A-Z]{1,5})\s*(?:@|at|@|在)?\s*\$?([\d,]+\.?\d*)', 'sell', 'sell'),
+    # Sell patterns - ticker first
+    (r'(?:sell|sold|short|exit|closed|cover|卖出|做空|平仓|切掉|切|卖出部份)\s+([A-Z]{1,5})\s+(?:@|at|@|在)?\s*\$?([\d,]+\.?\d*)\s*(?:x|×|乘)?\s*(\d+)', 'sell', 'sell'),
+    # Sell patterns - simplified (just ticker and price, assume quantity 1)
+    (r'(?:sell|sold|short|exit|closed|cover|卖出|做空|平仓|切掉|切|卖出部份)\s+([A-Z]{1,5})\s+(?:@|at|@|在)?\s*\$?([\d,]+\.?\d*)', 'sell', 'sell'),
+    # Position updates: "现1.78", "现成本0.96", "成本负了"
+    (r'([A-Z]{1,5}).*?(?:现|current|成本|cost)\s*([\+\-]?[\d,]+\.?\d*)', 'position', 'position'),
+    # Discord trading card format: "IONQ PUT" with "0.36" and "200"
+    # Pattern: TICKER PUT/CALL followed by price and quantity (flexible spacing)
+    # Match: "IONQ PUT 0.36 200" or "IONQ PUT\n0.36\n200" or "IONQ PUT 0.36 200张"
+    (r'([A-Z]{1,5})\s+(?:PUT|CALL|put|call)\s+(?:[\d\s]+)?\s*([\d,]+\.?\d*)\s*(?:[\d\s]+)?\s*(\d+)', 'buy', 'put_call'),
+    # More flexible: "IONQ PUT" anywhere, then price, then quantity (with optional text between)
+    (r'([A-Z]{1,5})\s+(?:PUT|CALL|put|call).*?([\d,]+\.?\d*).*?(\d+)\s*(?:张|contracts?|shares?)?', 'buy', 'put_call'),
+    # Even more flexible: ticker, PUT/CALL, then any numbers (price and quantity)
+    (r'([A-Z]{1,5})\s+(?:PUT|CALL|put|call).*?([\d,]+\.?\d+).*?(\d+)', 'buy', 'put_call'),
+    # Chinese trading card: "买入" + ticker + price + quantity
+    (r'(?:买入|卖出)\s*([A-Z]{1,5})\s*(?:PUT|CALL|put|call)?.*?([\d,]+\.?\d*).*?(\d+)\s*(?:张|contracts?|shares?)?', 'buy', 'cn_buy_sell'),
+    # Format: "全部成交" + ticker + price + quantity
+    (r'(?:全部成交|部分成交|成交)\s*([A-Z]{1,5})\s*(?:PUT|CALL|put|call)?.*?([\d,]+\.?\d*).*?(\d+)', 'buy', 'filled'),
+    # Standalone format: Just "IONQ PUT" followed by price and quantity in any order
+    (r'([A-Z]{1,5})\s+(?:PUT|CALL|put|call).*?(\d+\.\d+).*?(\d+)', 'buy', 'put_call'),
+    (r'([A-Z]{1,5})\s+(?:PUT|CALL|put|call).*?(\d+).*?(\d+\.\d+)', 'buy', 'put_call'),
+    # OCR-extracted format: May have spaces or special characters
+    # "IONQ PUT 0.36 200" or "IONQPUT 0.36 200" or "IONQ PUT 0 36 200"
+    (r'([A-Z]{1,5})\s*(?:PUT|CALL|put|call).*?([\d,]+\.?\d*).*?(\d+)\s*(?:张|contracts?|shares?)?', 'buy', 'put_call'),
+    # More flexible: Any ticker followed by PUT/CALL and numbers
+    (r'\b([A-Z]{1,5})\s*(?:PUT|CALL|put|call)\b.*?([\d,]+\.?\d+).*?(\d+)', 'buy', 'put_call'),
+    (r'\b([A-Z]{1,5})\s*(?:PUT|CALL|put|call)\b.*?(\d+).*?([\d,]+\.?\d+)', 'buy', 'put_call'),
+])
+
+# Every P/L pattern only yields a value when a digit is present; the negative-cost one needs 成本
+_PNL_TRIGGERS = {
+    'digit': re.compile(r'\d'),
+    'cost': re.compile(r'成本'),
+}
+
+# Patterns for P/L extraction - Support various formats including Chinese
+_PNL_PATTERNS = tuple((re.compile(pattern, re.IGNORECASE), pnl_type, _PNL_TRIGGERS[trigger]) for pattern, pnl_type, trigger in [
+    # "P/L: +$500", "profit: $1000", "loss: -$200"
+    (r'(?:p/l|pnl|profit|loss|gain|return|盈亏|盈利|亏损)\s*[:\-]?\s*([\+\-]?\$?[\d,]+\.?\d*)', None, 'digit'),
+    # "+$500", "-$200", "+5%", "-3%", "+90%", "gain 60%"
+    (r'([\+\-]\$?[\d,]+\.?\d*(?:\s*%|percent)?)', None, 'digit'),
+    (r'(?:gain|gained|盈利|赚)\s+([\+\-]?\d+\.?\d*(?:\s*%|percent)?)', 'profit', 'digit'),
+    # "made $500", "lost $200", "成本负了" (negative cost = profit)
+    (r'(?:made|earned|gained|profit|won|赚|盈利)\s+([\+\-]?\$?[\d,]+\.?\d*)', 'profit', 'digit'),
+    (r'(?:lost|losing|loss|亏|亏损)\s+([\+\-]?\$?[\d,]+\.?\d*)', 'loss', 'digit'),
+    # Chinese patterns: "成本负了" (cost is negative = profit)
+    (r'成本\s*(?:负|negative|is\s*negative)', 'profit', 'cost'),
+    # Percentage gains: "+90%", "gain 60%"
+    (r'[\+\-]?\d+\.?\d*\s*%', None, 'digit'),
+])
+
+
+def _span_covered(spans: List[Tuple[int, int]], start: int, end: int) -> bool:
+    """Check whether (start, end) lies inside one of the sorted spans"""
+    candidates = bisect_right(spans, (start, sys.maxsize))
+    return any(span_end >= end for _, span_end in spans[:candidates])
+
+
+# Messages kept in the summary for detailed review (the rest are only counted)
+SUMMARY_MESSAGE_LIMIT = 50
+
+
 class StockMarketAnalyzer:
     """Analyze and summarize stock market messages"""
     
-    def __init__(self):
-        # Keywords related to stock market
-        self.stock_keywords = [
-            "stock", "stocks", "equity", "equities",
-            "ticker", "tickers", "symbol", "symbols",
-            "buy", "sell", "long", "short", "position",
-            "bullish", "bearish", "bull", "bear",
-            "price", "target", "entry", "exit", "stop loss",
-            "earnings", "revenue", "profit", "loss",
-            "market", "trading", "trade", "trader",
-            "crypto", "bitcoin", "btc", "eth", "ethereum",
-            "forex", "fx", "currency", "currencies",
-            "option", "options", "call", "put",
-            "dividend", "yield", "pe ratio", "valuation",
-            "ipo", "merger", "acquisition", "split"
-        ]
+    def __init__(self, known_tickers: Optional[FrozenSet[str]] = None):
+        """
+        Args:
+            known_tickers: Listed ticker symbols; if given, extract_tickers drops any other match
+        """
+        self.stock_keywords = list(_STOCK_KEYWORDS)
+        self.known_tickers = known_tickers
     
     def is_stock_related(self, content: str) -> bool:
         """
@@ -431,48 +1159,44 @@ class StockMarketAnalyzer:
         content_lower = content.lower()
         
         # Check for stock keywords
-        if any(keyword in content_lower for keyword in self.stock_keywords):
+        if _has_stock_keyword(content_lower):
             return True
         
         # Check for stock tickers (e.g., $AAPL, TSLA, QQQ, MSTR)
         # This ensures messages with tickers are included even without keywords
-        tickers = self.extract_tickers(content)
-        if tickers:
+        if self._has_ticker(content):
             return True
         
         # Check for common trading patterns (numbers with p/c for options, percentages, etc.)
-        import re
-        # Options patterns: "166p", "609p", "166c", etc.
-        if re.search(r'\b\d+[pc]\b', content, re.IGNORECASE):
+        if _OPTIONS_PC_RE.search(content):
             return True
-        # Percentage patterns: "+90%", "gain 60%", etc.
-        if re.search(r'[\+\-]?\d+%', content):
+        if _PCT_RE.search(content):
             return True
-        # Price patterns: "2.89", "1.96", "成本0.96", etc.
-        if re.search(r'(?:成本|price|@|at)\s*[\d,]+\.?\d*', content, re.IGNORECASE):
+        if _PRICE_RE.search(content):
             return True
         
         return False
     
+    def _has_ticker(self, content: str) -> bool:
+        """Same as bool(self.extract_tickers(content)), but stops at the first ticker"""
+        # Every $TICKER match is also a standalone-uppercase match, so one pattern suffices
+        for match in _TICKER_BARE_RE.finditer(content):
+            ticker = match.group(1)
+            if ticker not in _NON_TICKERS and (self.known_tickers is None or ticker in self.known_tickers):
+                return True
+        return False
+    
     def extract_tickers(self, content: str) -> List[str]:
         """Extract potential stock tickers from message (simple pattern matching)"""
-        import re
         # Look for patterns like $AAPL, AAPL, or ticker symbols
-        ticker_patterns = [
-            r'\$([A-Z]{1,5})\b',  # $AAPL format
-            r'\b([A-Z]{1,5})\b',  # Standalone uppercase (2-5 chars)
-        ]
-        tickers = set()
-        for pattern in ticker_patterns:
-            matches = re.findall(pattern, content)
-            tickers.update(matches)
-        
-        # Filter out common non-ticker words that might be matched (case-insensitive)
-        # "bet" is not a ticker, it means "small position gambling" (case-insensitive)
-        non_tickers = {'BET', 'PUT', 'CALL', 'BUY', 'SELL', 'LONG', 'SHORT', 'AND', 'THE', 'FOR', 'ARE', 'BUT', 'NOT', 'YOU', 'ALL', 'CAN', 'HER', 'WAS', 'ONE', 'OUR', 'OUT', 'DAY', 'GET', 'HAS', 'HIM', 'HIS', 'HOW', 'ITS', 'MAY', 'NEW', 'NOW', 'OLD', 'SEE', 'TWO', 'WAY', 'WHO', 'BOY', 'DID', 'ITS', 'LET', 'SAY', 'SHE', 'TOO', 'USE'}
-        # Convert to uppercase for case-insensitive comparison
-        non_tickers_upper = {t.upper() for t in non_tickers}
-        tickers = {t for t in tickers if t.upper() not in non_tickers_upper}
+        tickers = set(_TICKER_DOLLAR_RE.findall(content))
+        tickers.update(_TICKER_BARE_RE.findall(content))
+        
+        # Filter out common non-ticker words that might be matched
+        tickers -= _NON_TICKERS
+        # Keep only listed symbols when a ticker list is configured (summary.tickers_file)
+        if self.known_tickers is not None:
+            tickers &= self.known_tickers
         
         return list(tickers)
     
@@ -481,70 +1205,23 @@ class StockMarketAnalyzer:
         Extract trading orders from message content
         Looks for buy/sell orders with quantities, prices, tickers
         """
-        import re
         orders = []
-        content_lower = content.lower()
+        # Several patterns overlap (e.g. the PUT/CALL card variants), so the same
+        # order can match more than once; keep only the first occurrence
+        seen_orders = set()
+        
+        # Normalize whitespace once for all patterns
+        content_cleaned = _WHITESPACE_RE.sub(' ', content)
+        content_lower = content_cleaned.lower()
         
-        # Patterns for order extraction - More flexible patterns to match various formats
-        # Buy/Sell patterns: "buy 100 TSLA at $250", "sold 50 shares", "long AAPL", "买入100股", etc.
-        # Also supports options: "mstr weekly 166p 2.89", "qqq 609p 1.96", etc.
-        order_patterns = [
-            # Options patterns: "mstr weekly 166p 2.89", "qqq 609p 1.96"
-            (r'([A-Z]{1,5})\s+(?:weekly|monthly|daily)?\s*(\d+)([pc])\s+([\d,]+\.?\d*)', 'buy'),  # Options format
-            (r'([A-Z]{1,5})\s*(\d+)([pc])\s+([\d,]+\.?\d*)', 'buy'),  # Simplified options
-            # Buy patterns - quantity first
-            (r'(?:buy|bought|long|entered|entry|买入|做多|加了一笔)\s+(?:@|at|@|在)?\s*(\d+)\s*(?:shares?|contracts?|股|手|份)?\s*(?:of\s+)?([A-Z]{1,5})\s*(?:@|at|@|在)?\s*\$?([\d,]+\.?\d*)', 'buy'),
-            # Buy patterns - ticker first
-            (r'(?:buy|bought|long|entered|entry|买入|做多|加了一笔)\s+([A-Z]{1,5})\s+(?:@|at|@|在)?\s*\$?([\d,]+\.?\d*)\s*(?:x|×|乘)?\s*(\d+)', 'buy'),
-            # Buy patterns - simplified (just ticker and price, assume quantity 1)
-            (r'(?:buy|bought|long|entered|entry|买入|做多|加了一笔)\s+([A-Z]{1,5})\s+(?:@|at|@|在)?\s*\$?([\d,]+\.?\d*)', 'buy'),
-            # "bet" pattern - "bet" means small position, followed by option info
-            # Format: "bet TICKER STRIKE P/C PRICE" or "bet TICKER STRIKEP/C PRICE"
-            (r'bet\s+([A-Z]{1,5})\s+(\d+)([pc])\s+([\d,]+\.?\d*)', 'buy'),
-            (r'bet\s+([A-Z]{1,5})\s+(\d+)([PC])\s+([\d,]+\.?\d*)', 'buy'),
-            # "bet" with quantity: "bet 100 TSLA 250c 2.5"
-            (r'bet\s+(\d+)\s+([A-Z]{1,5})\s+(\d+)([pc])\s+([\d,]+\.?\d*)', 'buy'),
-            # "bet PUT/CALL TICKER" format: "bet PUT BAC" or "bet CALL TSLA"
-            (r'bet\s+(?:PUT|CALL|put|call)\s+([A-Z]{1,5})', 'buy'),
-            # "bet PUT/CALL TICKER STRIKE" format: "bet PUT BAC 50" or "bet CALL TSLA 250"
-            (r'bet\s+(?:PUT|CALL|put|call)\s+([A-Z]{1,5})\s+(\d+)', 'buy'),
-            # "bet PUT/CALL TICKER STRIKE PRICE" format: "bet PUT BAC 50 2.5"
-            (r'bet\s+(?:PUT|CALL|put|call)\s+([A-Z]{1,5})\s+(\d+)\s+([\d,]+\.?\d*)', 'buy'),
-            # Sell patterns - quantity first
-            (r'(?:sell|sold|short|exit|closed|cover|卖出|做空|平仓|切掉|切|卖出部份)\s+(?:@|at|@|在)?\s*(\d+)\s*(?:shares?|contracts?|股|手|份)?\s*(?:of\s+)?([A-Z]{1,5})\s*(?:@|at|@|在)?\s*\$?([\d,]+\.?\d*)', 'sell'),
-            # Sell patterns - ticker first
-            (r'(?:sell|sold|short|exit|closed|cover|卖出|做空|平仓|切掉|切|卖出部份)\s+([A-Z]{1,5})\s+(?:@|at|@|在)?\s*\$?([\d,]+\.?\d*)\s*(?:x|×|乘)?\s*(\d+)', 'sell'),
-            # Sell patterns - simplified (just ticker and price, assume quantity 1)
-            (r'(?:sell|sold|short|exit|closed|cover|卖出|做空|平仓|切掉|切|卖出部份)\s+([A-Z]{1,5})\s+(?:@|at|@|在)?\s*\$?([\d,]+\.?\d*)', 'sell'),
-            # Position updates: "现1.78", "现成本0.96", "成本负了"
-            (r'([A-Z]{1,5}).*?(?:现|current|成本|cost)\s*([\+\-]?[\d,]+\.?\d*)', 'position'),
-            # Discord trading card format: "IONQ PUT" with "0.36" and "200"
-            # Pattern: TICKER PUT/CALL followed by price and quantity (flexible spacing)
-            # Match: "IONQ PUT 0.36 200" or "IONQ PUT\n0.36\n200" or "IONQ PUT 0.36 200张"
-            (r'([A-Z]{1,5})\s+(?:PUT|CALL|put|call)\s+(?:[\d\s]+)?\s*([\d,]+\.?\d*)\s*(?:[\d\s]+)?\s*(\d+)', 'buy'),
-            # More flexible: "IONQ PUT" anywhere, then price, then quantity (with optional text between)
-            (r'([A-Z]{1,5})\s+(?:PUT|CALL|put|call).*?([\d,]+\.?\d*).*?(\d+)\s*(?:张|contracts?|shares?)?', 'buy'),
-            # Even more flexible: ticker, PUT/CALL, then any numbers (price and quantity)
-            (r'([A-Z]{1,5})\s+(?:PUT|CALL|put|call).*?([\d,]+\.?\d+).*?(\d+)', 'buy'),
-            # Chinese trading card: "买入" + ticker + price + quantity
-            (r'(?:买入|卖出)\s*([A-Z]{1,5})\s*(?:PUT|CALL|put|call)?.*?([\d,]+\.?\d*).*?(\d+)\s*(?:张|contracts?|shares?)?', 'buy'),
-            # Format: "全部成交" + ticker + price + quantity
-            (r'(?:全部成交|部分成交|成交)\s*([A-Z]{1,5})\s*(?:PUT|CALL|put|call)?.*?([\d,]+\.?\d*).*?(\d+)', 'buy'),
-            # Standalone format: Just "IONQ PUT" followed by price and quantity in any order
-            (r'([A-Z]{1,5})\s+(?:PUT|CALL|put|call).*?(\d+\.\d+).*?(\d+)', 'buy'),
-            (r'([A-Z]{1,5})\s+(?:PUT|CALL|put|call).*?(\d+).*?(\d+\.\d+)', 'buy'),
-            # OCR-extracted format: May have spaces or special characters
-            # "IONQ PUT 0.36 200" or "IONQPUT 0.36 200" or "IONQ PUT 0 36 200"
-            (r'([A-Z]{1,5})\s*(?:PUT|CALL|put|call).*?([\d,]+\.?\d*).*?(\d+)\s*(?:张|contracts?|shares?)?', 'buy'),
-            # More flexible: Any ticker followed by PUT/CALL and numbers
-            (r'\b([A-Z]{1,5})\s*(?:PUT|CALL|put|call)\b.*?([\d,]+\.?\d+).*?(\d+)', 'buy'),
-            (r'\b([A-Z]{1,5})\s*(?:PUT|CALL|put|call)\b.*?(\d+).*?([\d,]+\.?\d+)', 'buy'),
-        ]
-        
-        for pattern, order_type in order_patterns:
-            # Try both original content and a cleaned version (remove extra spaces, normalize)
-            content_cleaned = re.sub(r'\s+', ' ', content)  # Normalize whitespace
-            matches = re.finditer(pattern, content_cleaned, re.IGNORECASE)  # Use cleaned content for better matching
+        # Whether each trigger occurs in this message, computed on first use
+        triggered: Dict[re.Pattern, bool] = {}
+        for pattern, order_type, trigger in _ORDER_PATTERNS:
+            if trigger not in triggered:
+                triggered[trigger] = trigger.search(content_lower) is not None
+            if not triggered[trigger]:
+                continue
+            matches = pattern.finditer(content_cleaned)  # Use cleaned content for better matching
             for match in matches:
                 groups = match.groups()
                 try:
@@ -689,7 +1366,11 @@ class StockMarketAnalyzer:
                     # Validate extracted data
                     # For "bet PUT/CALL TICKER" format, price might be 0, so allow it
                     if ticker and (price > 0 or ('BET' in match_text and len(groups) <= 3)):
+                        order_key = (order_type, ticker, quantity, price)
+                        if order_key in seen_orders:
+                            continue
                         if order_type == 'position':
+                            seen_orders.add(order_key)
                             orders.append({
                                 'type': 'position',
                                 'ticker': ticker,
@@ -699,6 +1380,7 @@ class StockMarketAnalyzer:
                             })
                         else:
                             if quantity > 0:
+                                seen_orders.add(order_key)
                                 order_entry = {
                                     'type': order_type,
                                     'ticker': ticker,
@@ -708,7 +1390,8 @@ class StockMarketAnalyzer:
                                 }
                                 orders.append(order_entry)
                                 # Debug output to help troubleshoot
-                                print(f"[DEBUG] Extracted order: {order_entry['type']} {order_entry['quantity']} {order_entry['ticker']} @ ${order_entry['price']:.2f} (from: {order_entry['text'][:50]}...)")
+                                if DEBUG:
+                                    print(f"[DEBUG] Extracted order: {order_entry['type']} {order_entry['quantity']} {order_entry['ticker']} @ ${order_entry['price']:.2f} (from: {order_entry['text'][:50]}...)")
                 except (ValueError, IndexError, AttributeError):
                     continue
         
@@ -719,32 +1402,24 @@ class StockMarketAnalyzer:
         Extract profit/loss information from message content
         Looks for P/L, gain/loss, profit/loss mentions
         """
-        import re
         pnl_list = []
-        content_lower = content.lower()
+        # Patterns overlap ("P/L: +$500" also matches "+$500"); keep only the widest match
+        seen_spans: List[Tuple[int, int]] = []
         
-        # Patterns for P/L extraction - Support various formats including Chinese
-        pnl_patterns = [
-            # "P/L: +$500", "profit: $1000", "loss: -$200"
-            (r'(?:p/l|pnl|profit|loss|gain|return|盈亏|盈利|亏损)\s*[:\-]?\s*([\+\-]?\$?[\d,]+\.?\d*)', None),
-            # "+$500", "-$200", "+5%", "-3%", "+90%", "gain 60%"
-            (r'([\+\-]\$?[\d,]+\.?\d*(?:\s*%|percent)?)', None),
-            (r'(?:gain|gained|盈利|赚)\s+([\+\-]?\d+\.?\d*(?:\s*%|percent)?)', 'profit'),
-            # "made $500", "lost $200", "成本负了" (negative cost = profit)
-            (r'(?:made|earned|gained|profit|won|赚|盈利)\s+([\+\-]?\$?[\d,]+\.?\d*)', 'profit'),
-            (r'(?:lost|losing|loss|亏|亏损)\s+([\+\-]?\$?[\d,]+\.?\d*)', 'loss'),
-            # Chinese patterns: "成本负了" (cost is negative = profit)
-            (r'成本\s*(?:负|negative|is\s*negative)', 'profit'),
-            # Percentage gains: "+90%", "gain 60%"
-            (r'[\+\-]?\d+\.?\d*\s*%', None),
-        ]
-        
-        for pattern, pnl_type in pnl_patterns:
-            matches = re.finditer(pattern, content, re.IGNORECASE)
+        triggered: Dict[re.Pattern, bool] = {}
+        for pattern, pnl_type, trigger in _PNL_PATTERNS:
+            if trigger not in triggered:
+                triggered[trigger] = trigger.search(content) is not None
+            if not triggered[trigger]:
+                continue
+            matches = pattern.finditer(content)
             for match in matches:
                 try:
                     # Special handling for "成本负了" (negative cost = profit)
                     match_text = match.group(0)
+                    span = match.span()
+                    if _span_covered(seen_spans, *span):
+                        continue
                     if '成本' in match_text and ('负' in match_text or 'negative' in match_text.lower()):
                         pnl_list.append({
                             'type': 'profit',
@@ -752,6 +1427,7 @@ class StockMarketAnalyzer:
                             'text': match_text,
                             'note': 'Negative cost (成本负了)'
                         })
+                        insort(seen_spans, span)
                         continue
                     
                     # Extract value from match
@@ -762,9 +1438,15 @@ class StockMarketAnalyzer:
                         # No capturing group, use the full match
                         value_str = match_text
                     
-                    # Clean value string
-                    is_percentage = '%' in value_str
-                    value_str = value_str.replace('$', '').replace(',', '').replace('%', '').strip()
+                    # Clean value string; "%" and "percent" can only trail the number
+                    is_percentage = True
+                    if value_str.endswith('%'):
+                        value_str = value_str[:-1]
+                    elif value_str[-7:].lower() == 'percent':
+                        value_str = value_str[:-7]
+                    else:
+                        is_percentage = False
+                    value_str = value_str.replace('$', '').replace(',', '').strip()
                     
                     if not value_str:
                         continue
@@ -782,6 +1464,7 @@ class StockMarketAnalyzer:
                             'text': match_text,
                             'is_percentage': True
                         })
+                        insort(seen_spans, span)
                     else:
                         # Determine type if not specified
                         if pnl_type is None:
@@ -796,6 +1479,7 @@ class StockMarketAnalyzer:
                             'value': value,
                             'text': match_text
                         })
+                        insort(seen_spans, span)
                 except (ValueError, IndexError, AttributeError):
                     continue
         
@@ -811,44 +1495,26 @@ class StockMarketAnalyzer:
         Returns:
             Summary dictionary
         """
+        # Only the first SUMMARY_MESSAGE_LIMIT messages are kept for detailed review;
+        # the rest are counted, and the date range is tracked as they go by
         stock_messages = []
+        stock_message_count = 0
         all_tickers = set()
-        message_dates = []
+        earliest: Optional[datetime] = None
+        latest: Optional[datetime] = None
         all_orders = []
         all_pnl = []
         
         for msg in messages:
             content = msg.get("content", "")
             # Extract content from embeds (Discord rich content like trading order cards)
-            embeds = msg.get("embeds", [])
-            embed_texts = []
-            for embed in embeds:
-                # Extract title
-                if "title" in embed:
-                    embed_texts.append(embed["title"])
-                # Extract description
-                if "description" in embed:
-                    embed_texts.append(embed["description"])
-                # Extract fields (common in trading order cards)
-                if "fields" in embed:
-                    for field in embed["fields"]:
-                        if "name" in field:
-                            embed_texts.append(field["name"])
-                        if "value" in field:
-                            embed_texts.append(field["value"])
-                # Extract footer
-                if "footer" in embed and "text" in embed["footer"]:
-                    embed_texts.append(embed["footer"]["text"])
-                # Extract author
-                if "author" in embed and "name" in embed["author"]:
-                    embed_texts.append(embed["author"]["name"])
+            embed_content = " ".join(filter(None, _iter_embed_texts(msg.get("embeds", []))))
             
             # Combine embed content with message content
-            if embed_texts:
-                embed_content = " ".join(embed_texts)
+            if embed_content:
                 content = (content + " " + embed_content).strip()
                 # Debug: Print embed content for troubleshooting
-                if embed_texts:
+                if DEBUG:
                     print(f"[DEBUG] Extracted embed content: {embed_content[:200]}...")
             
             # Check if message has attachments (images) - these might contain P/L info
@@ -858,23 +1524,21 @@ class StockMarketAnalyzer:
             # Extract text from image attachments using OCR
             image_texts = []
             if has_attachments and fetcher and OCR_AVAILABLE:
-                attachments = msg.get("attachments", [])
-                for attachment in attachments:
-                    # Check if it's an image
-                    content_type = attachment.get("content_type", "")
-                    filename = attachment.get("filename", "")
-                    if content_type.startswith("image/") or filename.lower().endswith((".png", ".jpg", ".jpeg", ".gif", ".webp")):
-                        image_url = attachment.get("url", "")
-                        if image_url:
-                            print(f"[OCR] Processing image attachment: {filename}")
-                            extracted_text = fetcher.extract_text_from_image(image_url)
-                            if extracted_text:
-                                image_texts.append(extracted_text)
-                                # Add OCR text to content for order extraction
-                                content += f" {extracted_text}"
-                                print(f"[OCR] Extracted text added to content: {extracted_text[:200]}...")
-                            else:
-                                print(f"[OCR] No text extracted from image: {filename}")
+                image_attachments = _image_attachments(msg)
+                for filename, _ in image_attachments:
+                    print(f"[OCR] Processing image attachment: {filename}")
+                
+                # All images of a message go through OCR as one batch, usually already
+                # started in the background while messages were being fetched
+                extracted_texts = fetcher.ocr_message_images(msg)
+                for (filename, _), extracted_text in zip(image_attachments, extracted_texts):
+                    if extracted_text:
+                        image_texts.append(extracted_text)
+                        # Add OCR text to content for order extraction
+                        content += f" {extracted_text}"
+                        print(f"[OCR] Extracted text added to content: {extracted_text[:200]}...")
+                    else:
+                        print(f"[OCR] No text extracted from image: {filename}")
             elif has_attachments and not OCR_AVAILABLE:
                 print(f"[WARNING] Image attachment found but OCR is not available. Install: pip install easyocr Pillow")
             elif has_attachments and not fetcher:
@@ -884,7 +1548,7 @@ class StockMarketAnalyzer:
             # We don't filter out discussions - all messages are included for context
             # This ensures we capture market discussions, strategies, and analysis, not just trading records
             # Only exception: if message is completely empty and has no attachments/embeds
-            if content.strip() or has_attachments or (has_embeds and embed_texts) or image_texts:
+            if content.strip() or has_attachments or (has_embeds and embed_content) or image_texts:
                 timestamp = msg.get("timestamp", "")
                 message_entry = {
                     "content": content,
@@ -899,58 +1563,60 @@ class StockMarketAnalyzer:
                     if image_texts:
                         message_entry["ocr_extracted"] = True
                         message_entry["ocr_text"] = " ".join(image_texts)
-                    else:
-                        # Note if OCR is not available or failed
-                        if not OCR_AVAILABLE:
-                            content += " [包含图片附件，但OCR未启用]"
-                        elif fetcher:
-                            content += " [包含图片附件，OCR提取失败或图片中无文字]"
-                        else:
-                            content += " [包含图片附件，可能包含交易记录或盈亏信息]"
                 
-                stock_messages.append(message_entry)
+                stock_message_count += 1
+                if len(stock_messages) < SUMMARY_MESSAGE_LIMIT:
+                    stock_messages.append(message_entry)
+                
+                # Parse timestamp
+                dt = _parse_discord_timestamp(timestamp)
+                if dt is not None:
+                    if earliest is None or dt < earliest:
+                        earliest = dt
+                    if latest is None or dt > latest:
+                        latest = dt
+                
+                # Image-only messages without OCR text have nothing to extract from
+                if not content or content.isspace():
+                    continue
                 
                 # Extract tickers
                 tickers = self.extract_tickers(content)
                 all_tickers.update(tickers)
                 
                 # Extract orders
-                print(f"[DEBUG] Extracting orders from content: {content[:200]}...")
+                if DEBUG:
+                    print(f"[DEBUG] Extracting orders from content: {content[:200]}...")
                 orders = self.extract_orders(content)
-                print(f"[DEBUG] Found {len(orders)} orders")
+                if DEBUG:
+                    print(f"[DEBUG] Found {len(orders)} orders")
                 for order in orders:
                     order['timestamp'] = timestamp
                     all_orders.append(order)
-                    print(f"[DEBUG] Added order: {order}")
+                    if DEBUG:
+                        print(f"[DEBUG] Added order: {order}")
                 
                 # Extract P/L
                 pnl = self.extract_pnl(content)
                 for p in pnl:
                     p['timestamp'] = timestamp
                     all_pnl.append(p)
-                
-                # Parse timestamp
-                try:
-                    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    message_dates.append(dt)
-                except:
-                    pass
         
         # Generate summary
         summary = {
             "total_messages": len(messages),
-            "stock_related_messages": len(stock_messages),
+            "stock_related_messages": stock_message_count,
             "tickers_mentioned": sorted(list(all_tickers)),
             "orders": all_orders,
             "pnl": all_pnl,
             "date_range": None,
-            "messages": stock_messages[:50]  # Keep first 50 for detailed review
+            "messages": stock_messages
         }
         
-        if message_dates:
+        if earliest is not None:
             summary["date_range"] = {
-                "earliest": min(message_dates).isoformat(),
-                "latest": max(message_dates).isoformat()
+                "earliest": earliest.isoformat(),
+                "latest": latest.isoformat()
             }
         
         return summary
@@ -958,9 +1624,9 @@ class StockMarketAnalyzer:
     def format_summary(self, summary: Dict[str, Any], username: str, channel_name: str = None, channel_names: List[str] = None) -> str:
         """Format summary as readable text"""
         output = []
-        output.append("=" * 80)
+        output.append(_SEP)
         output.append(f"STOCK MARKET MESSAGE SUMMARY")
-        output.append("=" * 80)
+        output.append(_SEP)
         output.append(f"User: {username}")
         if channel_names and len(channel_names) > 1:
             output.append(f"Channels: {', '.join(channel_names)}")
@@ -978,9 +1644,9 @@ class StockMarketAnalyzer:
             output.append(f"  Earliest: {summary['date_range']['earliest']}")
             output.append(f"  Latest: {summary['date_range']['latest']}")
         
-        output.append("\n" + "=" * 80)
+        output.append("\n" + _SEP)
         output.append("KEY MESSAGES:")
-        output.append("=" * 80)
+        output.append(_SEP)
         
         for i, msg in enumerate(summary.get("messages", [])[:20], 1):
             output.append(f"\n[{i}] {msg.get('timestamp', 'Unknown date')}")
@@ -991,114 +1657,21 @@ class StockMarketAnalyzer:
         return "\n".join(output)
 
 
-class AISummarizer:
-    """AI-powered summarization using OpenAI or other AI APIs"""
-    
-    def __init__(self, api_key: Optional[str] = None, provider: str = "openai"):
-        """
-        Initialize AI summarizer
-        
-        Args:
-            api_key: API key for the AI service
-            provider: AI provider ("openai", "anthropic", "local")
-        """
-        self.api_key = api_key
-        self.provider = provider.lower()
-    
-    def generate_daily_summary(self, summary_data: Dict[str, Any], username: str, channel_name: str = None, channel_names: List[str] = None, language: str = "chinese", custom_prompt: Optional[str] = None) -> str:
-        """
-        Generate AI-powered daily summary
-        
-        Args:
-            summary_data: Summary dictionary from StockMarketAnalyzer
-            username: Username being analyzed
-            channel_name: Channel name
-            language: Language for summary ("chinese" or "english")
-        
-        Returns:
-            AI-generated summary text
-        """
-        if not self.api_key:
-            return "AI summarization not configured. Please set AI API key in config."
-        
-        # Prepare context for AI - ONLY use stock-related messages
-        # The summary_data['messages'] already contains only stock-related messages
-        stock_messages = summary_data.get("messages", [])
-        
-        if not stock_messages:
-            channel_desc = f"在频道 {', '.join(channel_names)}" if channel_names and len(channel_names) > 1 else (f"在频道 {channel_name}" if channel_name else "")
-            return f"未找到股票相关的消息。用户 {username} {channel_desc} 在过去24小时内没有发布任何股票市场相关的内容。"
-        
-        # Limit to 50 most recent stock-related messages for context (increased for multi-channel)
-        messages_text = "\n\n".join([
-            f"[{msg.get('timestamp', 'Unknown')}] {msg.get('content', '')}"
-            for msg in stock_messages[:50]
-        ])
-        
-        # Format orders information - simplified, no specific numbers
-        orders = summary_data.get('orders', [])
-        orders_text = ""
-        if orders:
-            # Just mention that orders were detected, but don't list specific numbers
-            order_types = set()
-            tickers_mentioned = set()
-            for order in orders:
-                order_type = order.get('type', 'unknown').upper()
-                ticker = order.get('ticker', 'N/A')
-                if order_type != 'POSITION':
-                    order_types.add(order_type)
-                if ticker and ticker != 'N/A':
-                    tickers_mentioned.add(ticker)
-            
-            orders_text = "\n\n交易活动概览 (Trading Activity Overview):\n"
-            if order_types:
-                orders_text += f"检测到以下类型的交易操作: {', '.join(sorted(order_types))}\n"
-            if tickers_mentioned:
-                orders_text += f"涉及的股票/期权: {', '.join(sorted(tickers_mentioned))}\n"
-            orders_text += "注意：具体订单数量、价格等数字已省略，请关注市场讨论和分析。\n"
-        else:
-            orders_text = "\n\n交易活动: 未检测到明确的订单信息\n"
-        
-        # Format P/L information - completely simplified, no numbers or counts
-        pnl_list = summary_data.get('pnl', [])
-        pnl_text = ""
-        if pnl_list:
-            pnl_text = "\n\n盈亏情况概览 (Profit/Loss Overview):\n"
-            pnl_text += "检测到用户发布了盈亏相关信息。\n"
-            pnl_text += "注意：具体盈亏金额、百分比和记录数量已省略，请关注市场讨论和分析。\n"
-        else:
-            pnl_text = "\n\n盈亏情况: 未找到明确的盈亏信息\n"
-        
-        # Check for messages with images (might contain P/L info we can't extract)
-        messages_with_images = [msg for msg in stock_messages if msg.get('has_images', False)]
-        if messages_with_images:
-            pnl_text += f"\n注意: 有 {len(messages_with_images)} 条消息包含图片附件，可能包含额外的交易记录或盈亏信息（图片内容无法自动提取）\n"
-        
-        # Format channel name(s) for prompt
-        if channel_names and len(channel_names) > 1:
-            channel_desc = f"在以下频道中：{', '.join(channel_names)}"
-            channel_name_for_prompt = ', '.join(channel_names)
-        else:
-            channel_desc = f"在频道 {channel_name}" if channel_name else ""
-            channel_name_for_prompt = channel_name or "多个频道"
-        
-        # Use custom prompt if provided, otherwise use default
-        if custom_prompt:
-            # Replace placeholders in custom prompt
-            prompt = custom_prompt.format(
-                username=username,
-                channel_name=channel_name_for_prompt,
-                total_messages=summary_data.get('total_messages', 0),
-                stock_related_count=summary_data.get('stock_related_messages', 0),
-                tickers=', '.join(summary_data.get('tickers_mentioned', [])) or ('无' if language.lower() in ['chinese', 'zh'] else 'None'),
-                date_range=f"{summary_data.get('date_range', {}).get('earliest', 'Unknown')} 至 {summary_data.get('date_range', {}).get('latest', 'Unknown')}" if language.lower() in ['chinese', 'zh'] else f"{summary_data.get('date_range', {}).get('earliest', 'Unknown')} to {summary_data.get('date_range', {}).get('latest', 'Unknown')}",
-                messages_text=messages_text,
-                orders_text=orders_text,
-                pnl_text=pnl_text
-            )
-        elif language.lower() == "chinese" or language.lower() == "zh":
-            # Default Chinese prompt (can be customized)
-            default_prompt = """你是一位专业的金融分析师助手。请分析以下来自用户"{username}"{channel_desc}的股票市场消息，并创建一份全面的每日总结。
+# Legacy google.generativeai models, keyed by model name
+_MODEL_CACHE: Dict[str, Any] = {}
+
+
+def _get_generative_model(genai: Any, model_name: str) -> Any:
+    """Get a cached GenerativeModel from the legacy google.generativeai package"""
+    model = _MODEL_CACHE.get(model_name)
+    if model is None:
+        model = genai.GenerativeModel(model_name)
+        _MODEL_CACHE[model_name] = model
+    return model
+
+
+# Default AI prompt templates (same {placeholder} syntax as ai.custom_prompt)
+_DEFAULT_CN_PROMPT = """你是一位专业的金融分析师助手。请分析以下来自用户"{username}"{channel_desc}的股票市场消息，并创建一份全面的每日总结。
 
 关键信息：
 - 分析的消息总数：{total_messages}
@@ -1142,21 +1715,8 @@ class AISummarizer:
 7. **行动项目**：关键要点和建议行动
 
 请用清晰、专业的方式格式化总结，适合交易者和投资者阅读。特别注意分析用户的完整交易记录和盈亏情况。所有内容请使用中文。"""
-            
-            prompt = default_prompt.format(
-                username=username,
-                channel_desc=channel_desc,
-                total_messages=summary_data.get('total_messages', 0),
-                stock_related_count=summary_data.get('stock_related_messages', 0),
-                tickers=', '.join(summary_data.get('tickers_mentioned', [])) or '无',
-                date_range=f"{summary_data.get('date_range', {}).get('earliest', 'Unknown')} 至 {summary_data.get('date_range', {}).get('latest', 'Unknown')}",
-                messages_text=messages_text,
-                orders_text=orders_text,
-                pnl_text=pnl_text
-            )
-        else:
-            # Default English prompt (can be customized)
-            default_prompt = """You are a financial analyst assistant. Analyze the following stock market messages from user "{username}"{channel_desc} and create a comprehensive daily summary.
+
+_DEFAULT_EN_PROMPT = """You are a financial analyst assistant. Analyze the following stock market messages from user "{username}"{channel_desc} and create a comprehensive daily summary.
 
 Key Information:
 - Total messages analyzed: {total_messages}
@@ -1200,25 +1760,273 @@ Please provide a structured daily summary that includes:
 7. **Action Items**: Key takeaways and recommended actions
 
 Format the summary in a clear, professional manner suitable for traders and investors. Pay special attention to analyzing the user's complete trading record and P/L performance."""
-            
-            prompt = default_prompt.format(
-                username=username,
-                channel_desc=channel_desc,
-                total_messages=summary_data.get('total_messages', 0),
-                stock_related_count=summary_data.get('stock_related_messages', 0),
-                tickers=', '.join(summary_data.get('tickers_mentioned', [])) or 'None',
-                date_range=f"{summary_data.get('date_range', {}).get('earliest', 'Unknown')} to {summary_data.get('date_range', {}).get('latest', 'Unknown')}",
-                messages_text=messages_text
-            )
 
-        if self.provider == "openai":
-            return self._openai_summarize(prompt)
-        elif self.provider == "anthropic":
-            return self._anthropic_summarize(prompt)
-        elif self.provider == "gemini":
-            return self._gemini_summarize(prompt)
+# Compiled prompt templates (called with the placeholder values), keyed by (language, custom_prompt)
+_TEMPLATE_CACHE: Dict[Tuple[str, Optional[str]], Callable[..., str]] = {}
+
+
+def _compile_prompt_template(prompt_format: str) -> Callable[..., str]:
+    """Parse a str.format-style prompt once and convert it to a string.Template's substitute"""
+    parts = []
+    for literal, field_name, format_spec, conversion in Formatter().parse(prompt_format):
+        parts.append(literal.replace('$', '$$'))
+        if field_name is not None:
+            if format_spec or conversion or not field_name.isidentifier():
+                # e.g. {total_messages:>5} or {username!r}: keep str.format semantics
+                return prompt_format.format
+            parts.append('${' + field_name + '}')
+    return Template(''.join(parts)).substitute
+
+
+def _get_prompt_template(language: str, custom_prompt: Optional[str] = None) -> Callable[..., str]:
+    """Get the compiled prompt template for a language/custom prompt pair"""
+    key = (language.lower(), custom_prompt)
+    template = _TEMPLATE_CACHE.get(key)
+    if template is None:
+        if custom_prompt:
+            prompt_format = custom_prompt
+        elif key[0] in ('chinese', 'zh'):
+            prompt_format = _DEFAULT_CN_PROMPT
         else:
+            prompt_format = _DEFAULT_EN_PROMPT
+        template = _compile_prompt_template(prompt_format)
+        _TEMPLATE_CACHE[key] = template
+    return template
+
+
+# Where AISummaryCache keeps AI summaries of previously seen prompts
+AI_SUMMARY_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ai_summaries")
+AI_SUMMARY_CACHE_TTL = 7 * 86400  # seconds
+
+
+class AISummaryCache(_JsonlTTLCache):
+    """On-disk cache of AI summaries keyed by provider, model and exact prompt"""
+    
+    def __init__(self, directory: str = AI_SUMMARY_CACHE_DIR, ttl: float = AI_SUMMARY_CACHE_TTL):
+        super().__init__(os.path.join(directory, "ai_summary_cache.jsonl"), ttl, "AI summary cache")
+    
+    @staticmethod
+    def _key(provider: str, model: str, prompt: str) -> str:
+        # The prompt embeds the messages, tickers and date range, so an identical
+        # prompt to the same model means nothing changed since the summary was generated
+        return hashlib.sha256(f"{provider}\n{model}\n{prompt}".encode('utf-8')).hexdigest()
+
+
+# Gemini models in order of preference (Gemini 3 first if available, then flash models for free tier)
+_GEMINI_MODELS_PREFERRED = (
+    'gemini-3-pro',
+    'gemini-3-flash',
+    'gemini-3-pro-preview',
+    'gemini-3-flash-preview',
+    'gemini-2.5-flash',
+    'gemini-flash-latest',
+    'gemini-2.0-flash',
+    'gemini-2.5-flash-lite',
+    'gemini-flash-lite-latest',
+    'gemini-2.0-flash-lite',
+    'gemini-2.5-pro',
+    'gemini-pro-latest'
+)
+
+# Same for the legacy google.generativeai package
+_LEGACY_GEMINI_MODELS_PREFERRED = (
+    'gemini-3-pro',
+    'gemini-3-flash',
+    'gemini-3-pro-preview',
+    'gemini-3-flash-preview',
+    'gemini-1.5-flash',
+    'gemini-1.5-pro',
+    'gemini-1.0-pro',
+    'gemini-pro'
+)
+
+# Name fragments of listed models that cannot generate text
+_GEMINI_NON_TEXT_MODELS = ('embedding', 'imagen', 'veo', 'tts', 'audio', 'image-generation', 'computer-use', 'robotics', 'deep-research', 'aqa')
+
+
+# Rate-limited Gemini models are skipped for the server's retry delay, or this long
+# when the error does not say
+GEMINI_DEFAULT_RETRY_DELAY = 60.0  # seconds
+# Longest wait for a rate limit to reset when every model is limited
+GEMINI_MAX_RATE_LIMIT_WAIT = 30.0  # seconds
+# "Please retry in 37.5s." in the message, "'retryDelay': '37s'" in the RetryInfo details
+_RETRY_DELAY_RE = re.compile(r"retry in (\d+(?:\.\d+)?)s|retryDelay'?\"?\s*:\s*'?\"?(\d+(?:\.\d+)?)s", re.IGNORECASE)
+
+
+def _gemini_retry_delay(error_msg: str) -> float:
+    """Seconds until a rate-limited Gemini model may be retried, from its error message"""
+    match = _RETRY_DELAY_RE.search(error_msg)
+    if match:
+        return float(match.group(1) or match.group(2))
+    return GEMINI_DEFAULT_RETRY_DELAY
+
+
+def _resolve_gemini_model_order(text_generation_models: List[str]) -> List[Tuple[str, bool]]:
+    """Order in which to try Gemini models, as (model, is_fallback) without repeats"""
+    order = []
+    # Preferred models that are available, in order of preference
+    for preferred_model in _GEMINI_MODELS_PREFERRED:
+        matching_models = [m for m in text_generation_models if preferred_model in m.lower()]
+        if matching_models and (matching_models[0], False) not in order:
+            order.append((matching_models[0], False))
+    # If no preferred model worked, try any text generation model (first 5)
+    tried = {model for model, _ in order}
+    order.extend((model, True) for model in text_generation_models[:5] if model not in tried)
+    return order
+
+
+# Models used by the OpenAI and Anthropic backends (cheaper models; gpt-4 gives better quality)
+OPENAI_SUMMARY_MODEL = "gpt-4o-mini"
+ANTHROPIC_SUMMARY_MODEL = "claude-3-haiku-20240307"
+
+
+class AISummarizer:
+    """AI-powered summarization using OpenAI or other AI APIs"""
+    
+    def __init__(self, api_key: Optional[str] = None, provider: str = "openai", use_cache: bool = True):
+        """
+        Initialize AI summarizer
+        
+        Args:
+            api_key: API key for the AI service
+            provider: AI provider ("openai", "anthropic", "gemini")
+            use_cache: Reuse cached summaries of identical prompts (new summaries are cached either way)
+        """
+        self.api_key = api_key
+        self.provider = provider.lower()
+        # SDK client, created on first use and reused for every user
+        self._client = None
+        # Gemini models available to this key, listed on first use and reused for every user
+        # (the lock keeps concurrent summaries from each creating a client or listing them)
+        self._gemini_models: Optional[List[str]] = None
+        self._gemini_model_order: List[Tuple[str, bool]] = []
+        # Model -> time until which it is rate limited (shared by all users of this run)
+        self._gemini_quota_until: Dict[str, float] = {}
+        self._gemini_lock = threading.Lock()
+        # Re-runs over unchanged messages reuse the earlier summary unless use_cache is off
+        self.summary_cache = AISummaryCache()
+        self.use_cache = use_cache
+        # Model part of the summary cache key; Gemini picks from its preference list at request time
+        self.model = {
+            "openai": OPENAI_SUMMARY_MODEL,
+            "anthropic": ANTHROPIC_SUMMARY_MODEL,
+            "gemini": ",".join(_GEMINI_MODELS_PREFERRED),
+        }.get(self.provider, "")
+        # Provider backend, resolved once (None for unsupported providers)
+        self._summarize = {
+            "openai": self._openai_summarize,
+            "anthropic": self._anthropic_summarize,
+            "gemini": self._gemini_summarize,
+        }.get(self.provider)
+    
+    def generate_daily_summary(self, summary_data: Dict[str, Any], username: str, channel_name: str = None, channel_names: List[str] = None, language: str = "chinese", custom_prompt: Optional[str] = None) -> str:
+        """
+        Generate AI-powered daily summary
+        
+        Args:
+            summary_data: Summary dictionary from StockMarketAnalyzer
+            username: Username being analyzed
+            channel_name: Channel name
+            language: Language for summary ("chinese" or "english")
+        
+        Returns:
+            AI-generated summary text
+        """
+        if not self.api_key:
+            return "AI summarization not configured. Please set AI API key in config."
+        
+        # Prepare context for AI - ONLY use stock-related messages
+        # The summary_data['messages'] already contains only stock-related messages
+        stock_messages = summary_data.get("messages", [])
+        
+        if not stock_messages:
+            channel_desc = f"在频道 {', '.join(channel_names)}" if channel_names and len(channel_names) > 1 else (f"在频道 {channel_name}" if channel_name else "")
+            return f"未找到股票相关的消息。用户 {username} {channel_desc} 在过去24小时内没有发布任何股票市场相关的内容。"
+        
+        # Limit to 50 most recent stock-related messages for context (increased for multi-channel)
+        messages_text = "\n\n".join([
+            f"[{msg.get('timestamp', 'Unknown')}] {msg.get('content', '')}"
+            for msg in stock_messages[:50]
+        ])
+        
+        # Format orders information - simplified, no specific numbers
+        orders = summary_data.get('orders', [])
+        orders_text = ""
+        if orders:
+            # Just mention that orders were detected, but don't list specific numbers
+            order_types = set()
+            tickers_mentioned = set()
+            for order in orders:
+                order_type = order.get('type', 'unknown').upper()
+                ticker = order.get('ticker', 'N/A')
+                if order_type != 'POSITION':
+                    order_types.add(order_type)
+                if ticker and ticker != 'N/A':
+                    tickers_mentioned.add(ticker)
+            
+            orders_text = "\n\n交易活动概览 (Trading Activity Overview):\n"
+            if order_types:
+                orders_text += f"检测到以下类型的交易操作: {', '.join(sorted(order_types))}\n"
+            if tickers_mentioned:
+                orders_text += f"涉及的股票/期权: {', '.join(sorted(tickers_mentioned))}\n"
+            orders_text += "注意：具体订单数量、价格等数字已省略，请关注市场讨论和分析。\n"
+        else:
+            orders_text = "\n\n交易活动: 未检测到明确的订单信息\n"
+        
+        # Format P/L information - completely simplified, no numbers or counts
+        pnl_list = summary_data.get('pnl', [])
+        pnl_text = ""
+        if pnl_list:
+            pnl_text = "\n\n盈亏情况概览 (Profit/Loss Overview):\n"
+            pnl_text += "检测到用户发布了盈亏相关信息。\n"
+            pnl_text += "注意：具体盈亏金额、百分比和记录数量已省略，请关注市场讨论和分析。\n"
+        else:
+            pnl_text = "\n\n盈亏情况: 未找到明确的盈亏信息\n"
+        
+        # Check for messages with images (might contain P/L info we can't extract)
+        messages_with_images = [msg for msg in stock_messages if msg.get('has_images', False)]
+        if messages_with_images:
+            pnl_text += f"\n注意: 有 {len(messages_with_images)} 条消息包含图片附件，可能包含额外的交易记录或盈亏信息（图片内容无法自动提取）\n"
+        
+        # Format channel name(s) for prompt
+        if channel_names and len(channel_names) > 1:
+            channel_desc = f"在以下频道中：{', '.join(channel_names)}"
+            channel_name_for_prompt = ', '.join(channel_names)
+        else:
+            channel_desc = f"在频道 {channel_name}" if channel_name else ""
+            channel_name_for_prompt = channel_name or "多个频道"
+        
+        is_chinese = language.lower() in ('chinese', 'zh')
+        date_range = summary_data.get('date_range') or {}
+        earliest = date_range.get('earliest', 'Unknown')
+        latest = date_range.get('latest', 'Unknown')
+        
+        # Same placeholders for custom and default prompts
+        fill_prompt = _get_prompt_template(language, custom_prompt)
+        prompt = fill_prompt(
+            username=username,
+            channel_name=channel_name_for_prompt,
+            channel_desc=channel_desc,
+            total_messages=summary_data.get('total_messages', 0),
+            stock_related_count=summary_data.get('stock_related_messages', 0),
+            tickers=', '.join(summary_data.get('tickers_mentioned', [])) or ('无' if is_chinese else 'None'),
+            date_range=f"{earliest} 至 {latest}" if is_chinese else f"{earliest} to {latest}",
+            messages_text=messages_text,
+            orders_text=orders_text,
+            pnl_text=pnl_text
+        )
+
+        if self._summarize is None:
             return f"Unsupported AI provider: {self.provider}. Use 'openai', 'anthropic', or 'gemini'."
+        cached_summary = self.summary_cache.get(self.provider, self.model, prompt) if self.use_cache else None
+        if cached_summary is not None:
+            print(f"Using cached AI summary for {username}")
+            return cached_summary
+        ai_summary = self._summarize(prompt)
+        # Failures are reported as text; only cache real summaries
+        if _is_ai_summary_ok(ai_summary):
+            self.summary_cache.set(self.provider, self.model, prompt, text=ai_summary)
+        return ai_summary
     
     def _openai_summarize(self, prompt: str) -> str:
         """Summarize using OpenAI API"""
@@ -1229,10 +2037,12 @@ Format the summary in a clear, professional manner suitable for traders and inve
             except ImportError:
                 return "OpenAI library not installed. Install with: pip install openai"
             
-            client = openai.OpenAI(api_key=self.api_key)
+            if self._client is None:
+                self._client = openai.OpenAI(api_key=self.api_key)
+            client = self._client
             
             response = client.chat.completions.create(
-                model="gpt-4o-mini",  # Using cheaper model, can change to gpt-4 for better quality
+                model=OPENAI_SUMMARY_MODEL,
                 messages=[
                     {"role": "system", "content": "You are a professional financial analyst assistant specializing in stock market analysis and trading insights."},
                     {"role": "user", "content": prompt}
@@ -1251,10 +2061,12 @@ Format the summary in a clear, professional manner suitable for traders and inve
         try:
             import anthropic
             
-            client = anthropic.Anthropic(api_key=self.api_key)
+            if self._client is None:
+                self._client = anthropic.Anthropic(api_key=self.api_key)
+            client = self._client
             
             message = client.messages.create(
-                model="claude-3-haiku-20240307",  # Using cheaper model
+                model=ANTHROPIC_SUMMARY_MODEL,
                 max_tokens=8000,  # Increased to allow full summary output
                 messages=[
                     {"role": "user", "content": prompt}
@@ -1268,6 +2080,30 @@ Format the summary in a clear, professional manner suitable for traders and inve
         except Exception as e:
             return f"Error generating AI summary: {str(e)}"
     
+    @staticmethod
+    def _list_gemini_text_models(client: Any) -> List[str]:
+        """List the text generation models of a google.genai client, Gemini 3 first, then flash models"""
+        text_generation_models = []
+        for model in client.models.list():
+            if hasattr(model, 'name'):
+                model_name = model.name
+                # Extract just the model name part (e.g., 'gemini-1.5-flash' from full path)
+                if '/' in model_name:
+                    model_name = model_name.split('/')[-1]
+                
+                # Filter out embedding models and other non-text-generation models
+                if not any(skip in model_name.lower() for skip in _GEMINI_NON_TEXT_MODELS):
+                    # Prioritize Gemini 3 models first, then flash models, then others
+                    if 'gemini-3' in model_name.lower():
+                        text_generation_models.insert(0, model_name)  # Highest priority - Gemini 3
+                    elif 'flash' in model_name.lower() or 'latest' in model_name.lower():
+                        # Insert after Gemini 3 but before others
+                        gemini3_count = sum(1 for m in text_generation_models if 'gemini-3' in m.lower())
+                        text_generation_models.insert(gemini3_count, model_name)
+                    else:
+                        text_generation_models.append(model_name)
+        return text_generation_models
+    
     def _gemini_summarize(self, prompt: str) -> str:
         """Summarize using Google Gemini API"""
         try:
@@ -1284,59 +2120,27 @@ Format the summary in a clear, professional manner suitable for traders and inve
             
             if use_new_api:
                 # New API (google.genai)
-                client = genai.Client(api_key=self.api_key)
+                with self._gemini_lock:
+                    if self._client is None:
+                        self._client = genai.Client(api_key=self.api_key)
+                client = self._client
                 
                 # List available models first
                 try:
-                    models = client.models.list()
-                    available_model_names = []
-                    text_generation_models = []
+                    with self._gemini_lock:
+                        if self._gemini_models is None:
+                            self._gemini_models = self._list_gemini_text_models(client)
+                            print(f"Found {len(self._gemini_models)} text generation models")
+                            self._gemini_model_order = _resolve_gemini_model_order(self._gemini_models)
                     
-                    for model in models:
-                        if hasattr(model, 'name'):
-                            model_name = model.name
-                            # Extract just the model name part (e.g., 'gemini-1.5-flash' from full path)
-                            if '/' in model_name:
-                                model_name = model_name.split('/')[-1]
-                            
-                            available_model_names.append(model_name)
-                            
-                            # Filter out embedding models and other non-text-generation models
-                            if not any(skip in model_name.lower() for skip in ['embedding', 'imagen', 'veo', 'tts', 'audio', 'image-generation', 'computer-use', 'robotics', 'deep-research', 'aqa']):
-                                # Prioritize Gemini 3 models first, then flash models, then others
-                                if 'gemini-3' in model_name.lower():
-                                    text_generation_models.insert(0, model_name)  # Highest priority - Gemini 3
-                                elif 'flash' in model_name.lower() or 'latest' in model_name.lower():
-                                    # Insert after Gemini 3 but before others
-                                    gemini3_count = sum(1 for m in text_generation_models if 'gemini-3' in m.lower())
-                                    text_generation_models.insert(gemini3_count, model_name)
-                                else:
-                                    text_generation_models.append(model_name)
-                    
-                    print(f"Found {len(text_generation_models)} text generation models")
-                    
-                    # Try models in order of preference (Gemini 3 first if available, then flash models for free tier)
-                    models_to_try = [
-                        'gemini-3-pro',
-                        'gemini-3-flash',
-                        'gemini-3-pro-preview',
-                        'gemini-3-flash-preview',
-                        'gemini-2.5-flash',
-                        'gemini-flash-latest', 
-                        'gemini-2.0-flash',
-                        'gemini-2.5-flash-lite',
-                        'gemini-flash-lite-latest',
-                        'gemini-2.0-flash-lite',
-                        'gemini-2.5-pro',
-                        'gemini-pro-latest'
-                    ]
-                    
-                    # First, try preferred models that are available
-                    for preferred_model in models_to_try:
-                        matching_models = [m for m in text_generation_models if preferred_model in m.lower()]
-                        if matching_models:
-                            model_to_use = matching_models[0]
-                            print(f"Trying model: {model_to_use}")
+                    # Preferred models that are available first, then any other text generation model.
+                    # Rate-limited models are skipped until their quota resets instead of sleeping;
+                    # only when every model is limited is the shortest reset waited out (once)
+                    for attempt in range(2):
+                        for model_to_use, is_fallback in self._gemini_model_order:
+                            if self._gemini_quota_until.get(model_to_use, 0) > time.time():
+                                continue
+                            print(f"Trying {'fallback ' if is_fallback else ''}model: {model_to_use}")
                             try:
                                 response = client.models.generate_content(
                                     model=model_to_use,
@@ -1357,39 +2161,18 @@ Format the summary in a clear, professional manner suitable for traders and inve
                                 error_msg = str(e)
                                 # Skip rate limit errors but try other models
                                 if '429' in error_msg or 'quota' in error_msg.lower():
-                                    print(f"Rate limit/quota exceeded for {model_to_use}, trying next model...")
-                                    time.sleep(2)  # Brief delay
-                                    continue
-                                else:
+                                    retry_delay = _gemini_retry_delay(error_msg)
+                                    self._gemini_quota_until[model_to_use] = time.time() + retry_delay
+                                    print(f"Rate limit/quota exceeded for {model_to_use}, skipping it for {retry_delay:.0f}s...")
+                                elif not is_fallback:
                                     print(f"Error with model {model_to_use}: {error_msg[:100]}")
-                                    continue
-                    
-                    # If no preferred model worked, try any text generation model
-                    if text_generation_models:
-                        for model_to_use in text_generation_models[:5]:  # Try first 5
-                            print(f"Trying fallback model: {model_to_use}")
-                            try:
-                                response = client.models.generate_content(
-                                    model=model_to_use,
-                                    contents=prompt,
-                                    config=genai.types.GenerateContentConfig(
-                                        temperature=0.7,
-                                        max_output_tokens=8000,  # Increased to allow full summary output
-                                    )
-                                )
-                                if hasattr(response, 'text'):
-                                    return response.text
-                                elif hasattr(response, 'candidates') and response.candidates:
-                                    return response.candidates[0].content.parts[0].text
-                                else:
-                                    return str(response)
-                            except Exception as e:
-                                error_msg = str(e)
-                                if '429' in error_msg or 'quota' in error_msg.lower():
-                                    print(f"Rate limit for {model_to_use}, waiting...")
-                                    time.sleep(5)
-                                    continue
-                                continue
+                        
+                        wait = min((self._gemini_quota_until.get(model, 0) for model, _ in self._gemini_model_order),
+                                   default=0) - time.time()
+                        if attempt or not 0 < wait <= GEMINI_MAX_RATE_LIMIT_WAIT:
+                            break
+                        print(f"All Gemini models are rate limited, retrying in {wait:.0f}s...")
+                        time.sleep(wait)
                     
                     return "No suitable text generation models found or all exceeded quota"
                         
@@ -1401,26 +2184,21 @@ Format the summary in a clear, professional manner suitable for traders and inve
                 
                 # List available models first
                 try:
-                    models = genai.list_models()
-                    available_models = [m.name for m in models if 'generateContent' in m.supported_generation_methods]
-                    print(f"Available Gemini models: {available_models}")
+                    with self._gemini_lock:
+                        if self._gemini_models is None:
+                            models = genai.list_models()
+                            self._gemini_models = [m.name for m in models if 'generateContent' in m.supported_generation_methods]
+                            print(f"Available Gemini models: {self._gemini_models}")
+                    available_models = self._gemini_models
                     
-                    # Try models in order of preference (Gemini 3 first if available)
-                    models_to_try = [
-                        'gemini-3-pro',
-                        'gemini-3-flash',
-                        'gemini-3-pro-preview',
-                        'gemini-3-flash-preview',
-                        'gemini-1.5-flash', 
-                        'gemini-1.5-pro', 
-                        'gemini-1.0-pro', 
-                        'gemini-pro'
-                    ]
-                    for model_name in models_to_try:
+                    # Join once so each availability check is a single substring scan
+                    # (model names never contain newlines, so matches cannot span names)
+                    available_models_text = "\n".join(available_models)
+                    for model_name in _LEGACY_GEMINI_MODELS_PREFERRED:
                         # Check if model is in available models
-                        if any(model_name in m for m in available_models):
+                        if model_name in available_models_text:
                             try:
-                                model = genai.GenerativeModel(model_name)
+                                model = _get_generative_model(genai, model_name)
                                 response = model.generate_content(
                                     prompt,
                                     generation_config={
@@ -1435,7 +2213,7 @@ Format the summary in a clear, professional manner suitable for traders and inve
                     # If none worked, try the first available model
                     if available_models:
                         model_name = available_models[0].split('/')[-1]
-                        model = genai.GenerativeModel(model_name)
+                        model = _get_generative_model(genai, model_name)
                         response = model.generate_content(
                             prompt,
                             generation_config={
@@ -1454,52 +2232,236 @@ Format the summary in a clear, professional manner suitable for traders and inve
             return f"Error generating AI summary with Gemini: {str(e)}"
 
 
-def load_config(config_path: str, fallback_config: Optional[str] = None) -> Dict[str, Any]:
+# Where SummaryIndex keeps its per-day files
+SUMMARY_INDEX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "summaries")
+
+
+def _is_ai_summary_ok(ai_summary: Optional[str]) -> bool:
+    """AISummarizer reports failures as text, so detect them by their wording"""
+    return (bool(ai_summary) and not ai_summary.startswith(("Error", "No suitable", "No available"))
+            and "not installed" not in ai_summary)
+
+
+# Supported discord.user_filters layouts; the first one is the default
+# - user_to_channels: {username: [channel_id, ...]}
+# - channel_to_users: {channel_id: [username, ...]} (legacy discord_config.yaml layout)
+USER_FILTERS_FORMATS = ("user_to_channels", "channel_to_users")
+
+
+class SummaryIndex:
+    """Per-day on-disk index of users whose summary was already completed, with the finished summaries"""
+    
+    def __init__(self, directory: str = SUMMARY_INDEX_DIR, day: Optional[str] = None, options: str = ""):
+        """
+        Load today's index
+        
+        Args:
+            directory: Directory holding one YYYY-MM-DD.idx file per day
+            day: Day to use (default: today)
+            options: Run options the stored summaries depend on (time window, language, requested steps)
+        """
+        self.day = day or date.today().isoformat()
+        self.options = options
+        self.directory = directory
+        self.path = os.path.join(directory, f"{self.day}.idx")
+        self._keys: Set[str] = set()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._keys = {line.strip() for line in f if line.strip()}
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Warning: Could not read summary index {self.path}: {e}")
+    
+    def _key(self, username: str, channel_ids: List[str]) -> str:
+        # Changing the channel set or the run options for a user invalidates the entry
+        raw = f"{username}|{','.join(sorted(channel_ids))}|{self.day}|{self.options}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    
+    def is_done(self, username: str, channel_ids: List[str]) -> bool:
+        return self._key(username, channel_ids) in self._keys
+    
+    def _item_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{self.day}-{key}.json")
+    
+    def load_item(self, username: str, channel_ids: List[str]) -> Optional[Dict[str, Any]]:
+        """Summary item stored when the user was marked done, or None"""
+        key = self._key(username, channel_ids)
+        if key not in self._keys:
+            return None
+        try:
+            with open(self._item_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read stored summary for {username}: {e}")
+            return None
+    
+    def mark_done(self, username: str, channel_ids: List[str], item: Optional[Dict[str, Any]] = None) -> None:
+        key = self._key(username, channel_ids)
+        if key in self._keys:
+            return
+        self._keys.add(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if item is not None:
+                # Written before the index line so an indexed user always has its item
+                with open(self._item_path(key), 'w', encoding='utf-8') as f:
+                    json.dump(item, f, ensure_ascii=False)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(key + "\n")
+        except OSError as e:
+            print(f"Warning: Could not update summary index {self.path}: {e}")
+
+
+class SummaryReportWriter:
+    """Incrementally write the text report and its JSON companion file"""
+    
+    def __init__(self, output_path: str):
+        """
+        Open both report files and write their headers
+        
+        Args:
+            output_path: Text report path; JSON goes next to it (.txt -> .json)
+        """
+        self.output_path = output_path
+        self.json_path = output_path.replace('.txt', '.json') if output_path.endswith('.txt') else output_path + '.json'
+        self._count = 0
+        self._text_file = open(output_path, 'w', encoding='utf-8')
+        self._json_file = open(self.json_path, 'w', encoding='utf-8')
+        
+        self._text_file.write(f"{_SEP}\nDAILY SUMMARIES - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n{_SEP}\n\n")
+        self._json_file.write(f'{{\n  "generated_at": {json.dumps(datetime.now().isoformat())},\n  "summaries": [')
+        self._flush()
+        # Close the JSON document even if the run dies part-way through
+        atexit.register(self.close)
+    
+    def write(self, item: Dict[str, Any]) -> None:
+        """Append one user's summary to both files"""
+        if 'channels' in item:
+            channel_info = f"Channels: {', '.join(item['channels'])}"
+        else:
+            channel_info = f"Channel: {item['channel']}"
+        parts = [f"\n{_SEP}\n", f"User: {item['user']} | {channel_info}\n", f"{_SEP}\n\n", item['formatted_summary']]
+        if item['ai_summary']:
+            parts.append(f"\n\n{_SEP}\nAI-GENERATED DAILY SUMMARY\n{_SEP}\n\n")
+            parts.append(item['ai_summary'])
+        parts.append("\n\n")
+        self._text_file.write("".join(parts))
+        
+        record = {
+            "user": item['user'],
+            "channel": item.get('channel'),
+            "channels": item.get('channels'),
+            "channel_id": item.get('channel_id'),
+            "channel_ids": item.get('channel_ids'),
+            "summary": item['summary'],
+            "ai_summary": item['ai_summary']
+        }
+        separator = "," if self._count else ""
+        self._json_file.write(separator + "\n" + textwrap.indent(_json_dumps_indented(record), "    "))
+        self._count += 1
+        self._flush()
+    
+    def close(self) -> None:
+        """Finish the JSON document and close both files (safe to call twice)"""
+        if self._text_file.closed:
+            return
+        self._json_file.write("\n  ]\n}\n" if self._count else "]\n}\n")
+        self._text_file.close()
+        self._json_file.close()
+        atexit.unregister(self.close)
+    
+    def _flush(self) -> None:
+        self._text_file.flush()
+        self._json_file.flush()
+
+
+def _merge_dict(base: Dict[str, Any], override: Dict[str, Any]) -> None:
+    """Recursively merge override into base in place; override wins except where both hold dicts"""
+    for key, value in override.items():
+        if key in base and isinstance(base[key], dict) and isinstance(value, dict):
+            _merge_dict(base[key], value)
+        else:
+            base[key] = value
+
+
+def load_config(config_path: str, fallback_config: Optional[str] = None, return_primary: bool = False) -> Any:
     """
     Load configuration from YAML file
     
     Args:
         config_path: Primary config file path
         fallback_config: Optional fallback config file (e.g., discord_config.yaml for token)
+        return_primary: Also return the primary config as parsed, without the fallback
     
     Returns:
-        Merged configuration dictionary
+        Merged configuration dictionary, or (merged, primary) with return_primary
     """
     config = {}
+    primary = None
     
     # Load fallback config first (for Discord token if not in main config)
-    if fallback_config and os.path.exists(fallback_config):
+    if fallback_config:
         try:
             with open(fallback_config, 'r', encoding='utf-8') as f:
-                fallback = yaml.safe_load(f)
+                fallback = yaml.load(f, Loader=YAML_LOADER)
                 if fallback:
                     config.update(fallback)
+        except FileNotFoundError:
+            pass
         except Exception as e:
             print(f"Warning: Could not load fallback config {fallback_config}: {e}")
     
     # Load primary config (overrides fallback)
-    if os.path.exists(config_path):
-        try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                primary = yaml.safe_load(f)
-                if primary:
-                    # Merge configs (primary overrides fallback)
-                    def merge_dict(base: dict, override: dict):
-                        for key, value in override.items():
-                            if key in base and isinstance(base[key], dict) and isinstance(value, dict):
-                                merge_dict(base[key], value)
-                            else:
-                                base[key] = value
-                    
-                    merge_dict(config, primary)
-        except Exception as e:
-            print(f"Error loading config {config_path}: {e}")
-    elif not config:
-        print(f"Warning: Config file {config_path} not found")
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            primary = yaml.load(f, Loader=YAML_LOADER)
+            if primary:
+                # Merge configs (primary overrides fallback)
+                _merge_dict(config, primary)
+    except FileNotFoundError:
+        if not config:
+            print(f"Warning: Config file {config_path} not found")
+    except Exception as e:
+        print(f"Error loading config {config_path}: {e}")
+    
+    # Default the user_filters layout so callers never have to guess it
+    discord_config = config.get("discord")
+    if isinstance(discord_config, dict):
+        discord_config.setdefault("user_filters_format", USER_FILTERS_FORMATS[0])
     
+    if return_primary:
+        return config, primary or {}
     return config
 
 
+# Header prepended to each AI summary posted to Discord
+_SUMMARY_HEADER = "**📊 {user} 的每日总结**\n**频道:** {channels}\n\n"
+
+
+# Channels of one user fetched in parallel (each channel has its own rate-limit bucket)
+CHANNEL_FETCH_WORKERS = 8
+# AI summaries generated concurrently by default (ai.max_concurrent_requests)
+AI_SUMMARY_WORKERS = 4
+
+
+def _fetch_user_channel(fetcher: DiscordMessageFetcher, channel_id: str, username: str,
+                        max_messages: int, last_24_hours: bool) -> Tuple[str, List[Dict[str, Any]]]:
+    """Fetch a channel's name and a user's messages in it"""
+    print(f"  Fetching messages from channel {channel_id}...")
+    channel_info = fetcher.get_channel_info(channel_id)
+    channel_name = channel_info.get("name", channel_id) if channel_info else channel_id
+    messages = fetcher.fetch_all_user_messages(
+        channel_id, 
+        username, 
+        max_messages=max_messages,
+        last_24_hours=last_24_hours
+    )
+    return channel_name, messages
+
+
 def main():
     parser = argparse.ArgumentParser(description="Summarize stock market messages from a Discord user")
     parser.add_argument("--config", "-c", type=str, default="config/summary_config.yaml",
@@ -1532,20 +2494,19 @@ def main():
                       help="Send summary to Discord destination channel")
     parser.add_argument("--discord-channel", type=str,
                       help="Discord channel ID to send summary to (overrides config)")
+    parser.add_argument("--force", action="store_true",
+                      help="Regenerate cached AI summaries; with --all-users, also re-run users already summarized today")
+    parser.add_argument("--debug", action="store_true",
+                      help="Print per-message order extraction details")
     
     args = parser.parse_args()
+    if args.debug:
+        global DEBUG
+        DEBUG = True
     
     # Load configuration (with fallback to discord_config.yaml for token)
-    config = load_config(args.config, fallback_config=args.discord_config)
-    
-    # Load primary config separately to get user_filters (don't merge with fallback)
-    primary_config = {}
-    if os.path.exists(args.config):
-        try:
-            with open(args.config, 'r', encoding='utf-8') as f:
-                primary_config = yaml.safe_load(f) or {}
-        except Exception as e:
-            print(f"Warning: Could not load primary config {args.config}: {e}")
+    # The primary config is also kept on its own to get user_filters (don't merge with fallback)
+    config, primary_config = load_config(args.config, fallback_config=args.discord_config, return_primary=True)
     
     token = config.get("discord", {}).get("token")
     
@@ -1556,11 +2517,16 @@ def main():
     
     # Initialize fetcher and analyzer
     fetcher = DiscordMessageFetcher(token)
-    analyzer = StockMarketAnalyzer()
+    tickers_file = config.get("summary", {}).get("tickers_file")
+    analyzer = StockMarketAnalyzer(known_tickers=load_ticker_list(tickers_file) if tickers_file else None)
     
-    # Determine which users and channels to process
-    users_to_process = []
-    channels_to_process = []
+    # Determine which users and channels to process, as parallel lists:
+    # usernames[i] is summarized over channels_per_user[i]. With --all-users each
+    # user gets one summary combined across all their channels; with --user/--channel
+    # every entry holds a single channel.
+    usernames: List[str] = []
+    channels_per_user: List[List[str]] = []
+    multi_channel = bool(args.all_users)
     
     if args.all_users:
         # Get all users from user_filters config - ONLY from primary config file (summary_config.yaml)
@@ -1568,20 +2534,15 @@ def main():
         # New format: user -> [channels]
         user_filters = primary_config.get("discord", {}).get("user_filters", {})
         
-        # Check if it's old format (channel -> users) or new format (user -> channels)
+        # Layout is declared by discord.user_filters_format (defaulted in load_config)
+        user_filters_format = config.get("discord", {}).get("user_filters_format", USER_FILTERS_FORMATS[0])
+        if user_filters_format not in USER_FILTERS_FORMATS:
+            print(f"Error: Unknown discord.user_filters_format '{user_filters_format}'. "
+                  f"Use one of: {', '.join(USER_FILTERS_FORMATS)}")
+            sys.exit(1)
+        
         if user_filters:
-            # Check first item to determine format
-            first_key = list(user_filters.keys())[0]
-            first_value = user_filters[first_key]
-            
-            # If first value is a list and looks like usernames (not numeric), it's old format
-            # If first value is a list and looks like channel IDs (numeric strings), it's new format
-            # If first key looks like a username (not numeric), it's new format
-            is_old_format = first_key.isdigit() or (isinstance(first_value, list) and 
-                                                    len(first_value) > 0 and 
-                                                    not str(first_value[0]).isdigit())
-            
-            if is_old_format:
+            if user_filters_format == "channel_to_users":
                 # Old format: channel_id -> [users]
                 print("Converting old format (channel->users) to new format (user->channels)...")
                 converted = {}
@@ -1593,15 +2554,11 @@ def main():
                 user_filters = converted
             
             # New format: user -> [channels]
-            # Group by user to combine all channels for each user
-            users_to_process_dict = {}
             for username, channels in user_filters.items():
-                users_to_process_dict[username] = channels
-            
-            # Convert to list format: (username, [channel_ids])
-            users_to_process = [(username, channels) for username, channels in users_to_process_dict.items()]
+                usernames.append(username)
+                channels_per_user.append(channels)
         
-        if not users_to_process:
+        if not usernames:
             print("Error: No user_filters found in config. Please configure user_filters in summary_config.yaml")
             print("Format: user_filters:")
             print('  "username1": ["channel_id1", "channel_id2"]')
@@ -1614,23 +2571,27 @@ def main():
         # If multiple channels but one user, apply user to all channels
         # If multiple users but one channel, apply all users to that channel
         # If both multiple, pair them up
+        pairs = []
         if len(channels) == 1 and len(users) > 1:
             # One channel, multiple users
             for user in users:
-                users_to_process.append((channels[0], user))
+                pairs.append((channels[0], user))
         elif len(users) == 1 and len(channels) > 1:
             # Multiple channels, one user
             for channel_id in channels:
-                users_to_process.append((channel_id, users[0]))
+                pairs.append((channel_id, users[0]))
         elif len(channels) == len(users):
             # Same number, pair them up
-            for channel_id, user in zip(channels, users):
-                users_to_process.append((channel_id, user))
+            pairs.extend(zip(channels, users))
         else:
             # Default: apply all users to all channels
             for channel_id in channels:
                 for user in users:
-                    users_to_process.append((channel_id, user))
+                    pairs.append((channel_id, user))
+        
+        for channel_id, user in pairs:
+            usernames.append(user)
+            channels_per_user.append([channel_id])
     elif not args.user or not args.channel:
         print("Error: Must specify --user and --channel, or use --all-users")
         print("\nExamples:")
@@ -1642,57 +2603,154 @@ def main():
         print("  python summarize_user_messages.py --channel CH1 --channel CH2 --user user1 --ai")
         sys.exit(1)
     
-    if not users_to_process:
+    if not usernames:
         print("No users to process")
         sys.exit(0)
     
-    # Check if we're processing users with multiple channels (new format)
-    is_multi_channel_format = users_to_process and isinstance(users_to_process[0], tuple) and isinstance(users_to_process[0][1], list)
-    
-    if is_multi_channel_format:
-        total_channels = sum(len(channels) for _, channels in users_to_process)
-        print(f"\n{'='*80}")
-        print(f"Processing {len(users_to_process)} user(s) across {total_channels} channel(s)")
+    if multi_channel:
+        total_channels = sum(len(channels) for channels in channels_per_user)
+        print(f"\n{_SEP}")
+        print(f"Processing {len(usernames)} user(s) across {total_channels} channel(s)")
         print(f"Each user will have messages from all their channels combined into one summary")
-        print(f"{'='*80}\n")
+        print(f"{_SEP}\n")
     else:
-        print(f"\n{'='*80}")
-        print(f"Processing {len(users_to_process)} user-channel combination(s)")
-        print(f"{'='*80}\n")
+        print(f"\n{_SEP}")
+        print(f"Processing {len(usernames)} user-channel combination(s)")
+        print(f"{_SEP}\n")
     
-    # Process each user
+    # Process each user; with --output each summary is written as soon as it completes
     all_summaries = []
+    report_writer = SummaryReportWriter(args.output) if args.output else None
     
     # Fetch messages (default to last 24 hours unless --all-time is specified)
     last_24_hours = (not args.all_time and 
                     config.get("summary", {}).get("last_24_hours_only", True))
     max_msgs = args.max or config.get("summary", {}).get("max_messages", 500)
     
-    for item in users_to_process:
-        if is_multi_channel_format:
-            # New format: (username, [channel_ids]) - combine all channels for one user
-            username, channel_ids = item
-            print(f"\n{'='*80}")
+    # Resolve AI settings once and share a single summarizer across all users
+    ai_summarizer = None
+    language = args.language or config.get("summary", {}).get("language", "chinese")
+    custom_prompt = config.get("ai", {}).get("custom_prompt")
+    if args.ai or config.get("ai", {}).get("enabled", False):
+        ai_key = (args.ai_key or 
+                 config.get("ai", {}).get("api_key") or 
+                 os.getenv("OPENAI_API_KEY") or 
+                 os.getenv("ANTHROPIC_API_KEY") or
+                 os.getenv("GEMINI_API_KEY") or
+                 os.getenv("GOOGLE_API_KEY"))
+        ai_provider = args.ai_provider or config.get("ai", {}).get("provider", "gemini")
+        
+        if ai_key:
+            ai_summarizer = AISummarizer(api_key=ai_key, provider=ai_provider, use_cache=not args.force)
+        else:
+            print("⚠ AI API key not found. Set it in config file or use --ai-key parameter")
+    
+    # Send to Discord if requested
+    auto_send = (args.send_to_discord or 
+                config.get("summary", {}).get("auto_send_to_discord", False) or
+                config.get("discord", {}).get("auto_send_summary", False))
+    destination_channel_id = (args.discord_channel or 
+                             config.get("discord", {}).get("destination_channel_id"))
+    send_as_pdf = config.get("summary", {}).get("send_as_pdf", False)
+    
+    # Same-day re-runs of --all-users reuse the stored summary of users that already completed
+    # today with the same time window and language; the requested steps (AI summary, send to
+    # Discord) are part of the key so a run that skipped a step never satisfies one that asks for it
+    summary_options = f"{last_24_hours}|{language}|ai={ai_summarizer is not None}|send={bool(auto_send and destination_channel_id)}"
+    summary_index = SummaryIndex(options=summary_options) if args.all_users and not args.force else None
+    
+    # AI requests are network-bound, so they run on a small pool while the next users
+    # are fetched and analyzed; results are still sent and written in user order
+    ai_pool = None
+    if ai_summarizer:
+        ai_workers = config.get("ai", {}).get("max_concurrent_requests", AI_SUMMARY_WORKERS)
+        ai_pool = ThreadPoolExecutor(max_workers=max(1, int(ai_workers)), thread_name_prefix="ai-summary")
+    # (item, channel_ids, AI summary future) of users not finished yet, in user order
+    pending_users: List[Tuple[Dict[str, Any], List[str], Optional[Future]]] = []
+    
+    def summary_header(item: Dict[str, Any]) -> str:
+        """Header with user and channel info prepended to the summary sent to Discord"""
+        if multi_channel and item["channels"]:
+            channel_list = ", ".join(item["channels"])
+        else:
+            channel_list = item.get("channel")
+        return _SUMMARY_HEADER.format_map({"user": item["user"], "channels": channel_list})
+    
+    def summarize_user(item: Dict[str, Any], *args: Any, **kwargs: Any) -> Tuple[str, Optional[IO[bytes]]]:
+        """Generate a user's AI summary and, when it goes to Discord as a PDF, render the PDF too"""
+        ai_summary = ai_summarizer.generate_daily_summary(*args, **kwargs)
+        pdf_buffer = None
+        # Rendered on the AI worker so it overlaps with fetching and analyzing the next users
+        if auto_send and destination_channel_id and send_as_pdf and PDF_AVAILABLE and ai_summary:
+            pdf_buffer = fetcher.generate_pdf(summary_header(item) + ai_summary)
+        return ai_summary, pdf_buffer
+    
+    def finish_user(item: Dict[str, Any], channel_ids: List[str], ai_future: Optional[Future]) -> None:
+        """Send, write and index a user once its AI summary is ready"""
+        ai_summary = None
+        pdf_buffer = None
+        if ai_future is not None:
+            ai_summary, pdf_buffer = ai_future.result()
+            item["ai_summary"] = ai_summary
+            if not multi_channel:
+                if _is_ai_summary_ok(ai_summary):
+                    print(f"✓ AI summary generated for {item['user']}")
+                else:
+                    print(f"⚠ {ai_summary}")
+        
+        # A user only counts as done when every requested step succeeded; steps that were not
+        # requested are covered by the index key (summary_options)
+        completed = ai_summarizer is None or _is_ai_summary_ok(ai_summary)
+        
+        if auto_send and destination_channel_id and ai_summary:
+            full_summary = summary_header(item) + ai_summary
+            
+            print(f"\nSending summary to Discord channel {destination_channel_id} as {'PDF' if send_as_pdf else 'text'}...")
+            if fetcher.send_message(destination_channel_id, full_summary, as_pdf=send_as_pdf, pdf_buffer=pdf_buffer):
+                print(f"✓ Summary sent to Discord successfully for {item['user']}")
+            else:
+                print(f"✗ Failed to send summary to Discord for {item['user']}")
+                completed = False
+        
+        if report_writer:
+            # Written as soon as the user is done so a later failure keeps it
+            report_writer.write(item)
+        else:
+            all_summaries.append(item)
+        
+        if summary_index is not None and completed:
+            summary_index.mark_done(item["user"], channel_ids, item)
+    
+    for username, channel_ids in zip(usernames, channels_per_user):
+        if summary_index is not None and summary_index.is_done(username, channel_ids):
+            print(f"Skipping {username}: already summarized today (use --force to re-run)")
+            # Reported again without fetching, analyzing or sending; finish_user keeps user order
+            item = summary_index.load_item(username, channel_ids)
+            if item is not None:
+                pending_users.append((item, channel_ids, None))
+            continue
+        
+        ai_future = None
+        if multi_channel:
+            # Combine all channels for one user
+            print(f"\n{_SEP}")
             print(f"Processing: {username} across {len(channel_ids)} channel(s)")
-            print(f"{'='*80}")
+            print(f"{_SEP}")
             
-            # Fetch messages from all channels for this user
+            # Fetch messages from all channels for this user. Each channel has its own
+            # Discord rate-limit bucket, so channels are paginated concurrently
             all_messages = []
             channel_names = []
             
-            for channel_id in channel_ids:
-                print(f"  Fetching messages from channel {channel_id}...")
-                channel_info = fetcher.get_channel_info(channel_id)
-                channel_name = channel_info.get("name", channel_id) if channel_info else channel_id
+            with ThreadPoolExecutor(max_workers=min(len(channel_ids), CHANNEL_FETCH_WORKERS)) as channel_pool:
+                channel_jobs = [
+                    channel_pool.submit(_fetch_user_channel, fetcher, channel_id, username, max_msgs, last_24_hours)
+                    for channel_id in channel_ids
+                ]
+                channel_results = [job.result() for job in channel_jobs]
+            
+            for channel_name, messages in channel_results:
                 channel_names.append(channel_name)
-                
-                messages = fetcher.fetch_all_user_messages(
-                    channel_id, 
-                    username, 
-                    max_messages=max_msgs,
-                    last_24_hours=last_24_hours
-                )
-                
                 if messages:
                     print(f"    Found {len(messages)} messages from {channel_name}")
                     all_messages.extend(messages)
@@ -1710,37 +2768,34 @@ def main():
             # Format basic summary
             formatted_summary = analyzer.format_summary(summary, username, channel_names=channel_names)
             
+            # Store summary for file output
+            item = {
+                "user": username,
+                "channels": channel_names,
+                "channel_ids": channel_ids,
+                "summary": summary,
+                "formatted_summary": formatted_summary,
+                "ai_summary": None
+            }
+            
             # Generate AI summary if requested
-            ai_summary = None
-            if args.ai or config.get("ai", {}).get("enabled", False):
+            if ai_summarizer:
                 print(f"\nGenerating AI-powered summary for {username} (combined from {len(channel_ids)} channels)...")
-                ai_key = (args.ai_key or 
-                         config.get("ai", {}).get("api_key") or 
-                         os.getenv("OPENAI_API_KEY") or 
-                         os.getenv("ANTHROPIC_API_KEY") or
-                         os.getenv("GEMINI_API_KEY") or
-                         os.getenv("GOOGLE_API_KEY"))
-                ai_provider = args.ai_provider or config.get("ai", {}).get("provider", "gemini")
-                language = args.language or config.get("summary", {}).get("language", "chinese")
-                
-                if ai_key:
-                    # Get custom prompt from config if available
-                    custom_prompt = config.get("ai", {}).get("custom_prompt")
-                    
-                    ai_summarizer = AISummarizer(api_key=ai_key, provider=ai_provider)
-                    ai_summary = ai_summarizer.generate_daily_summary(
-                        summary, 
-                        username, 
-                        channel_names=channel_names, 
-                        language=language,
-                        custom_prompt=custom_prompt
-                    )
+                ai_future = ai_pool.submit(
+                    summarize_user,
+                    item,
+                    summary, 
+                    username, 
+                    channel_names=channel_names, 
+                    language=language,
+                    custom_prompt=custom_prompt
+                )
         else:
-            # Old format: (channel_id, username) - single channel per user
-            channel_id, username = item
-            print(f"\n{'='*80}")
+            # Single channel per user
+            channel_id = channel_ids[0]
+            print(f"\n{_SEP}")
             print(f"Processing: {username} in channel {channel_id}")
-            print(f"{'='*80}")
+            print(f"{_SEP}")
             
             # Get channel info
             channel_info = fetcher.get_channel_info(channel_id)
@@ -1764,151 +2819,60 @@ def main():
             # Format basic summary
             formatted_summary = analyzer.format_summary(summary, username, channel_name)
             
-            # Generate AI summary if requested
-            ai_summary = None
-            if args.ai or config.get("ai", {}).get("enabled", False):
-                print(f"\nGenerating AI-powered summary for {username}...")
-                ai_key = (args.ai_key or 
-                         config.get("ai", {}).get("api_key") or 
-                         os.getenv("OPENAI_API_KEY") or 
-                         os.getenv("ANTHROPIC_API_KEY") or
-                         os.getenv("GEMINI_API_KEY") or
-                         os.getenv("GOOGLE_API_KEY"))
-                ai_provider = args.ai_provider or config.get("ai", {}).get("provider", "gemini")
-                language = args.language or config.get("summary", {}).get("language", "chinese")
-                
-                if ai_key:
-                    # Get custom prompt from config if available
-                    custom_prompt = config.get("ai", {}).get("custom_prompt")
-                    
-                    ai_summarizer = AISummarizer(api_key=ai_key, provider=ai_provider)
-                    ai_summary = ai_summarizer.generate_daily_summary(
-                        summary, 
-                        username, 
-                        channel_name, 
-                        language=language,
-                        custom_prompt=custom_prompt
-                    )
-                if ai_summary and not ai_summary.startswith("Error") and not "not installed" in ai_summary:
-                    print(f"✓ AI summary generated for {username}")
-                else:
-                    print(f"⚠ {ai_summary}")
-            else:
-                print("⚠ AI API key not found. Set it in config file or use --ai-key parameter")
-        
-        # Send to Discord if requested
-        auto_send = (args.send_to_discord or 
-                    config.get("summary", {}).get("auto_send_to_discord", False) or
-                    config.get("discord", {}).get("auto_send_summary", False))
-        
-        if auto_send:
-            destination_channel_id = (args.discord_channel or 
-                                     config.get("discord", {}).get("destination_channel_id"))
-            
-            if destination_channel_id and ai_summary:
-                # Add header with user and channel info
-                if is_multi_channel_format and channel_names:
-                    channel_list = ", ".join(channel_names)
-                    summary_header = f"**📊 {username} 的每日总结**\n**频道:** {channel_list}\n\n"
-                else:
-                    summary_header = f"**📊 {username} 的每日总结**\n**频道:** {channel_name}\n\n"
-                full_summary = summary_header + ai_summary
-                
-                # Check if should send as PDF
-                send_as_pdf = config.get("summary", {}).get("send_as_pdf", False)
-                
-                print(f"\nSending summary to Discord channel {destination_channel_id} as {'PDF' if send_as_pdf else 'text'}...")
-                if fetcher.send_message(destination_channel_id, full_summary, as_pdf=send_as_pdf):
-                    print(f"✓ Summary sent to Discord successfully for {username}")
-                else:
-                    print(f"✗ Failed to send summary to Discord for {username}")
-        
-        # Store summary for file output
-        if is_multi_channel_format and 'channel_names' in locals():
-            all_summaries.append({
-                "user": username,
-                "channels": channel_names,
-                "channel_ids": channel_ids,
-                "summary": summary,
-                "formatted_summary": formatted_summary,
-                "ai_summary": ai_summary
-            })
-        else:
-            all_summaries.append({
+            # Store summary for file output
+            item = {
                 "user": username,
                 "channel": channel_name,
                 "channel_id": channel_id,
                 "summary": summary,
                 "formatted_summary": formatted_summary,
-                "ai_summary": ai_summary
-            })
-    
-    # Save all summaries to file
-    if args.output:
-        final_output = f"{'='*80}\n"
-        final_output += f"DAILY SUMMARIES - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        final_output += f"{'='*80}\n\n"
-        
-        for item in all_summaries:
-            final_output += f"\n{'='*80}\n"
-            if 'channels' in item:
-                channel_info = f"Channels: {', '.join(item['channels'])}"
-            else:
-                channel_info = f"Channel: {item['channel']}"
-            final_output += f"User: {item['user']} | {channel_info}\n"
-            final_output += f"{'='*80}\n\n"
-            final_output += item['formatted_summary']
+                "ai_summary": None
+            }
             
-            if item['ai_summary']:
-                final_output += "\n\n" + "=" * 80 + "\n"
-                final_output += "AI-GENERATED DAILY SUMMARY\n"
-                final_output += "=" * 80 + "\n\n"
-                final_output += item['ai_summary']
-            final_output += "\n\n"
-        
-        with open(args.output, 'w', encoding='utf-8') as f:
-            f.write(final_output)
-        
-        # Also save raw summaries as JSON
-        json_path = args.output.replace('.txt', '.json') if args.output.endswith('.txt') else args.output + '.json'
-        json_data = {
-            "generated_at": datetime.now().isoformat(),
-            "summaries": [
-                {
-                    "user": item['user'],
-                    "channel": item.get('channel'),
-                    "channels": item.get('channels'),
-                    "channel_id": item.get('channel_id'),
-                    "channel_ids": item.get('channel_ids'),
-                    "summary": item['summary'],
-                    "ai_summary": item['ai_summary']
-                }
-                for item in all_summaries
-            ]
-        }
-        with open(json_path, 'w', encoding='utf-8') as jf:
-            json.dump(json_data, jf, indent=2, ensure_ascii=False)
+            # Generate AI summary if requested
+            if ai_summarizer:
+                print(f"\nGenerating AI-powered summary for {username}...")
+                ai_future = ai_pool.submit(
+                    summarize_user,
+                    item,
+                    summary, 
+                    username, 
+                    channel_name, 
+                    language=language,
+                    custom_prompt=custom_prompt
+                )
         
-        print(f"\n✓ All summaries saved to: {args.output}")
-        print(f"✓ JSON data saved to: {json_path}")
+        pending_users.append((item, channel_ids, ai_future))
+        # Finish users whose AI summary is already back, without overtaking earlier ones
+        while pending_users and (pending_users[0][2] is None or pending_users[0][2].done()):
+            finish_user(*pending_users.pop(0))
+    
+    for pending_user in pending_users:
+        finish_user(*pending_user)
+    if ai_pool is not None:
+        ai_pool.shutdown()
+    
+    if report_writer:
+        report_writer.close()
+        print(f"\n✓ All summaries saved to: {report_writer.output_path}")
+        print(f"✓ JSON data saved to: {report_writer.json_path}")
     else:
         # Print summaries
         for item in all_summaries:
-            print(f"\n{'='*80}")
+            print(f"\n{_SEP}")
             if 'channels' in item:
                 channel_info = f"Channels: {', '.join(item['channels'])}"
             else:
                 channel_info = f"Channel: {item['channel']}"
             print(f"User: {item['user']} | {channel_info}")
-            print(f"{'='*80}\n")
+            print(f"{_SEP}\n")
             print(item['formatted_summary'])
             if item['ai_summary']:
-                print("\n" + "=" * 80)
+                print("\n" + _SEP)
                 print("AI-GENERATED DAILY SUMMARY")
-                print("=" * 80 + "\n")
+                print(_SEP + "\n")
                 print(item['ai_summary'])
 
-
 if __name__ == "__main__":
     main()
 
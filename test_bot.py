@@ -3,15 +3,23 @@ import asyncio
 import logging
 import argparse
 import yaml
+from dataclasses import replace
 from datetime import datetime
 import uuid
 
+from config.config import YAML_LOADER
 from core.models import AlertInfo, TradeDirection
 from core.orchestrator import TradingOrchestrator
 from utils.logging import setup_logging
 
+# Optional: uvloop's libuv-based event loop (not available on Windows)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # Sample alert messages for testing
-SAMPLE_ALERTS = [
+SAMPLE_ALERTS = (
     # Standard format
     """🚨 SIGNAL ALERT 🚨
 Symbol: AAPL
@@ -39,22 +47,36 @@ Technical setup: Cup and Handle
 止损: 62000
 策略: 突破
 """
-]
+)
+
+# Alerts for the manual and rejected trade tests; each run gets its own
+# correlation ID and timestamp via dataclasses.replace
+MANUAL_ALERT = AlertInfo(
+    symbol="TSLA",
+    direction="bull",
+    price=900.0,
+    strategy_id="Manual Test"
+)
+# A risky alert (using a blacklisted symbol or excessive quantity)
+RISKY_ALERT = AlertInfo(
+    symbol="BLACKLISTED",  # This should be rejected if configured correctly
+    direction="bull",
+    price=1000.0,
+    strategy_id="Risky Test"
+)
 
 
-async def test_discord_parsing(orchestrator, test_message):
+async def test_discord_parsing(orchestrator, test_messages):
     """Test Discord message parsing without actual trading."""
-    print(f"\n--- Testing Discord message parsing ---")
-    print(f"Message:\n{test_message}\n")
-    
-    # Manually trigger the message processing (simulating Discord listener)
-    result = orchestrator.process_message(test_message)
-    
-    print(f"Processed successfully: {result}")
-    print(f"Current stats: {orchestrator.get_stats()}")
-    
-    # Wait a moment to allow all async operations to complete
-    await asyncio.sleep(1)
+    for test_message in test_messages:
+        print(f"\n--- Testing Discord message parsing ---")
+        print(f"Message:\n{test_message}\n")
+        
+        # Manually trigger the message processing (simulating Discord listener)
+        result = orchestrator.process_message(test_message)
+        
+        print(f"Processed successfully: {result}")
+        print(f"Current stats: {orchestrator.get_stats()}")
 
 
 async def test_manual_trade(orchestrator):
@@ -62,14 +84,7 @@ async def test_manual_trade(orchestrator):
     print(f"\n--- Testing manual trade execution ---")
     
     # Create a sample alert
-    alert = AlertInfo(
-        symbol="TSLA",
-        direction="bull",
-        price=900.0,
-        strategy_id="Manual Test",
-        correlation_id=str(uuid.uuid4()),
-        timestamp=datetime.now()
-    )
+    alert = replace(MANUAL_ALERT, correlation_id=str(uuid.uuid4()), timestamp=datetime.now())
     
     print(f"Executing manual trade for {alert.symbol} at ${alert.price}")
     
@@ -85,24 +100,14 @@ async def test_manual_trade(orchestrator):
         print(f"Error: {result.error}")
     
     print(f"Current stats: {orchestrator.get_stats()}")
-    
-    # Wait a moment to allow all async operations to complete
-    await asyncio.sleep(1)
 
 
 async def test_rejected_trade(orchestrator):
     """Test a trade that should be rejected by risk management."""
     print(f"\n--- Testing rejected trade ---")
     
-    # Create a risky alert (using a blacklisted symbol or excessive quantity)
-    alert = AlertInfo(
-        symbol="BLACKLISTED",  # This should be rejected if configured correctly
-        direction="bull",
-        price=1000.0,
-        strategy_id="Risky Test",
-        correlation_id=str(uuid.uuid4()),
-        timestamp=datetime.now()
-    )
+    # Create a risky alert
+    alert = replace(RISKY_ALERT, correlation_id=str(uuid.uuid4()), timestamp=datetime.now())
     
     print(f"Executing risky trade for {alert.symbol} at ${alert.price}")
     
@@ -112,9 +117,6 @@ async def test_rejected_trade(orchestrator):
     print(f"Trade execution result: {result.success}")
     print(f"Error/Reason: {result.error}")
     print(f"Current stats: {orchestrator.get_stats()}")
-    
-    # Wait a moment to allow all async operations to complete
-    await asyncio.sleep(1)
 
 
 async def main():
@@ -137,7 +139,7 @@ async def main():
     # Load configuration
     try:
         with open(args.config, 'r') as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=YAML_LOADER)
     except Exception as e:
         logging.error(f"Failed to load configuration: {str(e)}")
         return
@@ -161,8 +163,7 @@ async def main():
         
         # Run the requested tests
         if args.test in ['all', 'parsing']:
-            for i, message in enumerate(SAMPLE_ALERTS):
-                await test_discord_parsing(trading_bot, message)
+            await test_discord_parsing(trading_bot, SAMPLE_ALERTS)
         
         if args.test in ['all', 'manual']:
             await test_manual_trade(trading_bot)
@@ -177,4 +178,7 @@ async def main():
 
 if __name__ == "__main__":
     # Run the main async function
-    asyncio.run(main()) 
\ No newline at end of file
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main()) 
\ No newline at end of file
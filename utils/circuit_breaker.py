@@ -1,6 +1,8 @@
 import time
+import inspect
 import logging
-from typing import Any, Callable, TypeVar, cast
+import threading
+from typing import Any, Awaitable, Callable, TypeVar, cast
 from enum import Enum
 from functools import wraps
 
@@ -20,57 +22,98 @@ class CircuitBreaker:
         self.service_name = service_name
         self.failure_threshold = failure_threshold
         self.reset_timeout = reset_timeout
+        self.reset_timeout_ns = int(reset_timeout * 1_000_000_000)
         self.half_open_max_calls = half_open_max_calls
         
         self.failure_count = 0
-        self.last_failure_time = 0
+        self.last_failure_time_ns = 0  # time.monotonic_ns() of the last failure
         self.state = CircuitState.CLOSED
         self.half_open_count = 0
+        # Guards state transitions; calls through a CLOSED circuit only take it on failure
+        self._lock = threading.Lock()
     
     def execute(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
-        if self.state == CircuitState.OPEN:
-            if time.time() - self.last_failure_time >= self.reset_timeout:
-                logger.info(f"Circuit for {self.service_name} transitioning from OPEN to HALF_OPEN")
-                self.state = CircuitState.HALF_OPEN
-                self.half_open_count = 0
-            else:
-                raise CircuitBreakerError(f"Circuit for {self.service_name} is OPEN")
-        
-        if self.state == CircuitState.HALF_OPEN and self.half_open_count >= self.half_open_max_calls:
-            raise CircuitBreakerError(f"Circuit for {self.service_name} is HALF_OPEN and max calls reached")
+        # Fast path: a single read of the state, no lock while the circuit is CLOSED
+        if self.state is CircuitState.CLOSED:
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                self.record_failure()
+                raise
         
+        half_open = self._before_call()
         try:
-            if self.state == CircuitState.HALF_OPEN:
-                self.half_open_count += 1
-            
             result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        
+        # If we get here, the call was successful
+        if half_open:
+            self._record_half_open_success()
+        return result
+    
+    async def aexecute(self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """Like execute, for a coroutine function; the call is awaited on the running loop"""
+        if self.state is CircuitState.CLOSED:
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                self.record_failure()
+                raise
+        
+        half_open = self._before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        
+        if half_open:
+            self._record_half_open_success()
+        return result
+    
+    def _before_call(self) -> bool:
+        """Admit a call through an OPEN/HALF_OPEN circuit or raise; returns whether it is a HALF_OPEN probe"""
+        with self._lock:
+            if self.state == CircuitState.OPEN:
+                if time.monotonic_ns() - self.last_failure_time_ns >= self.reset_timeout_ns:
+                    logger.info(f"Circuit for {self.service_name} transitioning from OPEN to HALF_OPEN")
+                    self.state = CircuitState.HALF_OPEN
+                    self.half_open_count = 0
+                else:
+                    raise CircuitBreakerError(f"Circuit for {self.service_name} is OPEN")
             
-            # If we get here, the call was successful
+            if self.state != CircuitState.HALF_OPEN:
+                return False
+            if self.half_open_count >= self.half_open_max_calls:
+                raise CircuitBreakerError(f"Circuit for {self.service_name} is HALF_OPEN and max calls reached")
+            self.half_open_count += 1
+            return True
+    
+    def _record_half_open_success(self) -> None:
+        with self._lock:
             if self.state == CircuitState.HALF_OPEN:
                 logger.info(f"Circuit for {self.service_name} transitioning from HALF_OPEN to CLOSED")
                 self.state = CircuitState.CLOSED
                 self.failure_count = 0
                 self.half_open_count = 0
-            
-            return result
-        
-        except Exception as e:
-            self.record_failure()
-            raise e
     
     def record_failure(self):
-        self.failure_count += 1
-        self.last_failure_time = time.time()
-        
-        if (self.state == CircuitState.CLOSED and self.failure_count >= self.failure_threshold) or \
-           self.state == CircuitState.HALF_OPEN:
-            logger.warning(f"Circuit for {self.service_name} transitioning to OPEN due to failures")
-            self.state = CircuitState.OPEN
+        with self._lock:
+            self.failure_count += 1
+            self.last_failure_time_ns = time.monotonic_ns()
+            
+            if (self.state == CircuitState.CLOSED and self.failure_count >= self.failure_threshold) or \
+               self.state == CircuitState.HALF_OPEN:
+                logger.warning(f"Circuit for {self.service_name} transitioning to OPEN due to failures")
+                self.state = CircuitState.OPEN
     
     def reset(self):
-        self.failure_count = 0
-        self.state = CircuitState.CLOSED
-        self.half_open_count = 0
+        with self._lock:
+            self.failure_count = 0
+            self.state = CircuitState.CLOSED
+            self.half_open_count = 0
         logger.info(f"Circuit for {self.service_name} has been manually reset")
     
     def get_state(self) -> CircuitState:
@@ -83,6 +126,12 @@ class CircuitBreakerError(Exception):
 
 def circuit_breaker(circuit: CircuitBreaker):
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await circuit.aexecute(func, *args, **kwargs)
+            return async_wrapper
+        
         @wraps(func)
         def wrapper(*args, **kwargs):
             return circuit.execute(func, *args, **kwargs)
@@ -1,15 +1,46 @@
 import logging
+import logging.handlers
 import os
 import json
 import sys
-from datetime import datetime
+import time
+import copy
+import queue
+import atexit
 from typing import Dict, Any, Optional
 
+# Optional: orjson encodes log records several times faster; falls back to json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Level names accepted by setup_logging and log_with_context
+_LEVELS = {name: getattr(logging, name) for name in ('DEBUG', 'INFO', 'WARNING', 'WARN', 'ERROR', 'CRITICAL', 'FATAL')}
+
 
 class JSONFormatter(logging.Formatter):
+    # (second, "YYYY-MM-DDTHH:MM:SS" local time) of the last record; one tuple so threads
+    # sharing the formatter never see a second paired with another second's text
+    _last_second = (None, '')
+    
+    def _timestamp(self, created: float) -> str:
+        second = int(created)
+        # Rounded like datetime.fromtimestamp, carrying into the next second
+        microsecond = round((created - second) * 1_000_000)
+        if microsecond == 1_000_000:
+            second += 1
+            microsecond = 0
+        cached_second, prefix = self._last_second
+        if second != cached_second:
+            prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(second))
+            self._last_second = (second, prefix)
+        return f"{prefix}.{microsecond:06d}"
+    
     def format(self, record):
         log_data = {
-            'timestamp': datetime.fromtimestamp(record.created).isoformat(),
+            'timestamp': self._timestamp(record.created),
             'level': record.levelname,
             'message': record.getMessage(),
             'logger': record.name,
@@ -23,68 +54,130 @@ class JSONFormatter(logging.Formatter):
             
         if hasattr(record, 'data') and record.data:
             log_data['data'] = record.data
-            
+        
+        if orjson is not None:
+            return orjson.dumps(log_data).decode('utf-8')
         return json.dumps(log_data)
 
 
+class _RecordQueueHandler(logging.handlers.QueueHandler):
+    # The stock prepare() formats the record and drops exc_info, which would lose
+    # JSONFormatter's separate 'exception' field; the queue is in-process, so keep it
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+# Write buffer of the log file; records below WARNING stay buffered until the queue drains
+LOG_FILE_BUFFER_SIZE = 64 * 1024
+
+
+class _BufferedFileHandler(logging.FileHandler):
+    # FileHandler flushes after every record, one write syscall each; below WARNING
+    # records are only buffered and _FlushingQueueListener flushes once it runs dry
+    def _open(self):
+        return open(self.baseFilename, self.mode, encoding=self.encoding, errors=self.errors,
+                    buffering=LOG_FILE_BUFFER_SIZE)
+    
+    def emit(self, record):
+        if record.levelno >= logging.WARNING or self.stream is None:
+            super().emit(record)
+            return
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+class _FlushingQueueListener(logging.handlers.QueueListener):
+    # Flush the handlers whenever the queue is empty, so a burst of records is
+    # written in large chunks and nothing lingers in the buffer while idle
+    def dequeue(self, block):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            for handler in self.handlers:
+                handler.flush()
+            return self.queue.get(block)
+
+
+# Writes queued records to the real handlers on a background thread
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _stop_queue_listener():
+    global _queue_listener
+    if _queue_listener is not None:
+        # Writes every record still queued
+        _queue_listener.stop()
+        for handler in _queue_listener.handlers:
+            handler.flush()
+        _queue_listener = None
+
+
+atexit.register(_stop_queue_listener)
+
+
 def setup_logging(level: str = "INFO", log_file: Optional[str] = None, json_format: bool = True):
-    log_level = getattr(logging, level.upper(), logging.INFO)
+    global _queue_listener
+    log_level = _LEVELS.get(level.upper(), logging.INFO)
     
     # Configure root logger
     logger = logging.getLogger()
     logger.setLevel(log_level)
     
     # Remove existing handlers
+    _stop_queue_listener()
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
     
-    # Create console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(log_level)
-    
+    # One formatter shared by all handlers
     if json_format:
-        console_handler.setFormatter(JSONFormatter())
+        formatter = JSONFormatter()
     else:
-        console_handler.setFormatter(
-            logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        )
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     
-    logger.addHandler(console_handler)
+    # Create console handler
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(log_level)
+    console_handler.setFormatter(formatter)
+    handlers = [console_handler]
     
     # Add file handler if log_file is specified
     if log_file:
         os.makedirs(os.path.dirname(log_file), exist_ok=True)
-        file_handler = logging.FileHandler(log_file)
+        file_handler = _BufferedFileHandler(log_file)
         file_handler.setLevel(log_level)
-        
-        if json_format:
-            file_handler.setFormatter(JSONFormatter())
-        else:
-            file_handler.setFormatter(
-                logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-            )
-        
-        logger.addHandler(file_handler)
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    
+    # Logging calls only enqueue the record; formatting and console/file writes
+    # happen on the listener thread
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(_RecordQueueHandler(log_queue))
+    _queue_listener = _FlushingQueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
     
     return logger
 
 
 def log_with_context(logger, level: str, message: str, correlation_id: Optional[str] = None, 
                      data: Optional[Dict[str, Any]] = None):
-    record = logging.LogRecord(
-        name=logger.name,
-        level=getattr(logging, level.upper()),
-        pathname='',
-        lineno=0,
-        msg=message,
-        args=(),
-        exc_info=None
-    )
+    level_no = _LEVELS[level.upper()]
+    if not logger.isEnabledFor(level_no):
+        return
     
+    extra = {}
     if correlation_id:
-        record.correlation_id = correlation_id
+        extra['correlation_id'] = correlation_id
     
     if data:
-        record.data = data
+        extra['data'] = data
     
-    logger.handle(record) 
\ No newline at end of file
+    # stacklevel=2 attributes the record to the caller rather than this helper
+    logger.log(level_no, message, extra=extra, stacklevel=2)
@@ -1,4 +1,6 @@
 import time
+import asyncio
+import inspect
 import logging
 import random
 from functools import wraps
@@ -17,31 +19,59 @@ def retry_with_backoff(max_retries: int = 3,
     
     if exception_types is None:
         exception_types = [Exception]
+    exception_tuple = tuple(exception_types)
+    # Capped delay before retry n at index n - 1
+    delays = tuple(min(initial_delay * (backoff_factor ** i), max_delay) for i in range(max_retries))
+    rand = random.random
+    
+    def backoff_delay(retries: int, e: Exception) -> float:
+        # Calculate delay with optional jitter
+        current_delay = delays[retries - 1]
+        if jitter:
+            current_delay *= 0.5 + rand()
+        
+        logger.warning(f"Retry {retries}/{max_retries} after error: {e}. "
+                      f"Waiting {current_delay:.2f}s...")
+        return current_delay
     
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        if inspect.iscoroutinefunction(func):
+            # Coroutine functions back off with asyncio.sleep so the event loop keeps running
+            @wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> T:
+                retries = 0
+                
+                while True:
+                    try:
+                        return await func(*args, **kwargs)
+                    except exception_tuple as e:
+                        retries += 1
+                        if retries > max_retries:
+                            logger.error(f"Failed after {max_retries} retries: {e}")
+                            raise
+                        
+                        await asyncio.sleep(backoff_delay(retries, e))
+                    except Exception as e:
+                        # Don't retry unexpected exceptions
+                        logger.error(f"Unexpected error (not retrying): {e}")
+                        raise
+            
+            return async_wrapper
+        
         @wraps(func)
         def wrapper(*args: Any, **kwargs: Any) -> T:
             retries = 0
-            delay = initial_delay
             
             while True:
                 try:
                     return func(*args, **kwargs)
-                except tuple(exception_types) as e:
+                except exception_tuple as e:
                     retries += 1
                     if retries > max_retries:
                         logger.error(f"Failed after {max_retries} retries: {e}")
                         raise
                     
-                    # Calculate delay with optional jitter
-                    current_delay = min(delay * (backoff_factor ** (retries - 1)), max_delay)
-                    if jitter:
-                        current_delay = current_delay * (0.5 + random.random())
-                    
-                    logger.warning(f"Retry {retries}/{max_retries} after error: {e}. "
-                                  f"Waiting {current_delay:.2f}s...")
-                    
-                    time.sleep(current_delay)
+                    time.sleep(backoff_delay(retries, e))
                 except Exception as e:
                     # Don't retry unexpected exceptions
                     logger.error(f"Unexpected error (not retrying): {e}")
@@ -58,6 +88,7 @@ def retry_on_specific_errors(func: Optional[Callable] = None,
     
     if error_types is None:
         error_types = [Exception]
+    error_tuple = tuple(error_types)
     
     def decorator(f):
         @wraps(f)
@@ -66,7 +97,7 @@ def retry_on_specific_errors(func: Optional[Callable] = None,
             while attempt < retries:
                 try:
                     return f(*args, **kwargs)
-                except tuple(error_types) as e:
+                except error_tuple as e:
                     attempt += 1
                     if attempt == retries:
                         logger.error(f"Failed after {retries} attempts: {e}")